@@ -76,7 +76,8 @@ async def run_migrations_online() -> None:
 
     """
     configuration = alembic_config.get_section(alembic_config.config_ini_section)
-    configuration["sqlalchemy.url"] = config.DATABASE_URL.replace("+asyncpg", "")
+    # Асинхронному движку нужен асинхронный драйвер (asyncpg из DATABASE_URL)
+    configuration["sqlalchemy.url"] = config.DATABASE_URL
     
     connectable = async_engine_from_config(
         configuration,
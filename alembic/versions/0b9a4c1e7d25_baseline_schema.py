@@ -0,0 +1,257 @@
+"""baseline schema: tables created by init_db() before migrations were introduced
+
+Revision ID: 0b9a4c1e7d25
+Revises:
+Create Date: 2026-10-18 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b9a4c1e7d25'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Схема в том виде, в котором ее создавал init_db() до первой миграции.
+# IF NOT EXISTS: на базе, созданной init_db(), ревизия ничего не меняет
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS achievements (
+        id BIGSERIAL NOT NULL,
+        name VARCHAR(255) NOT NULL,
+        description TEXT,
+        icon VARCHAR(50),
+        criteria_type VARCHAR(50) NOT NULL,
+        criteria_value INTEGER NOT NULL,
+        points_reward INTEGER NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS courses (
+        id BIGSERIAL NOT NULL,
+        title VARCHAR(255) NOT NULL,
+        description TEXT,
+        icon VARCHAR(50),
+        difficulty_level INTEGER NOT NULL,
+        total_days INTEGER NOT NULL,
+        is_active BOOLEAN NOT NULL,
+        sort_order INTEGER NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quiz_questions (
+        id BIGSERIAL NOT NULL,
+        question_text TEXT NOT NULL,
+        question_type VARCHAR(50) NOT NULL,
+        options JSON NOT NULL,
+        correct_answer INTEGER NOT NULL,
+        category VARCHAR(100) NOT NULL,
+        difficulty INTEGER NOT NULL,
+        explanation TEXT,
+        is_active BOOLEAN NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_quiz_active ON quiz_questions (is_active)",
+    "CREATE INDEX IF NOT EXISTS idx_quiz_category ON quiz_questions (category)",
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id BIGSERIAL NOT NULL,
+        telegram_id BIGINT NOT NULL,
+        username VARCHAR(255),
+        full_name VARCHAR(255),
+        language_code VARCHAR(10) NOT NULL,
+        points INTEGER NOT NULL,
+        current_streak INTEGER NOT NULL,
+        longest_streak INTEGER NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,
+        settings JSON NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_telegram_id ON users (telegram_id)",
+    """
+    CREATE TABLE IF NOT EXISTS daily_focus (
+        id BIGSERIAL NOT NULL,
+        user_id BIGINT NOT NULL,
+        date DATE DEFAULT CURRENT_DATE NOT NULL,
+        skill_ids JSON NOT NULL,
+        completed_skill_ids JSON NOT NULL,
+        is_daily_completed BOOLEAN NOT NULL,
+        PRIMARY KEY (id),
+        CONSTRAINT uq_user_date UNIQUE (user_id, date),
+        FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_user_date ON daily_focus (user_id, date)",
+    """
+    CREATE TABLE IF NOT EXISTS lessons (
+        id BIGSERIAL NOT NULL,
+        course_id BIGINT NOT NULL,
+        day_number INTEGER NOT NULL,
+        title VARCHAR(255) NOT NULL,
+        content_type VARCHAR(50) NOT NULL,
+        content_url TEXT,
+        text_content TEXT,
+        pdf_url TEXT,
+        quiz_questions JSON,
+        unlock_condition VARCHAR(50) NOT NULL,
+        additional_materials JSON,
+        lesson_config JSON,
+        PRIMARY KEY (id),
+        FOREIGN KEY(course_id) REFERENCES courses (id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_lesson_course_day ON lessons (course_id, day_number)",
+    """
+    CREATE TABLE IF NOT EXISTS skills (
+        id BIGSERIAL NOT NULL,
+        title VARCHAR(255) NOT NULL,
+        description TEXT NOT NULL,
+        skill_type VARCHAR(50) NOT NULL,
+        repetition_type VARCHAR(50) NOT NULL,
+        target_streak INTEGER NOT NULL,
+        duration_days INTEGER,
+        points_per_completion INTEGER NOT NULL,
+        course_id BIGINT,
+        lesson_day INTEGER,
+        cooldown_hours INTEGER NOT NULL,
+        is_active BOOLEAN NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(course_id) REFERENCES courses (id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_achievements (
+        user_id BIGINT NOT NULL,
+        achievement_id BIGINT NOT NULL,
+        unlocked_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,
+        PRIMARY KEY (user_id, achievement_id),
+        FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE,
+        FOREIGN KEY(achievement_id) REFERENCES achievements (id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_course_progress (
+        id BIGSERIAL NOT NULL,
+        user_id BIGINT NOT NULL,
+        course_id BIGINT NOT NULL,
+        current_lesson_day INTEGER NOT NULL,
+        status VARCHAR(50) NOT NULL,
+        started_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,
+        completed_at TIMESTAMP WITHOUT TIME ZONE,
+        last_activity TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        CONSTRAINT uq_user_course UNIQUE (user_id, course_id),
+        FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE,
+        FOREIGN KEY(course_id) REFERENCES courses (id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_user_course ON user_course_progress (user_id, course_id)",
+    """
+    CREATE TABLE IF NOT EXISTS user_quiz_progress (
+        id BIGSERIAL NOT NULL,
+        user_id BIGINT NOT NULL,
+        quiz_mode VARCHAR(50) NOT NULL,
+        score INTEGER NOT NULL,
+        current_streak INTEGER NOT NULL,
+        longest_streak INTEGER NOT NULL,
+        total_answered INTEGER NOT NULL,
+        total_correct INTEGER NOT NULL,
+        last_played TIMESTAMP WITHOUT TIME ZONE,
+        category_stats JSON NOT NULL,
+        PRIMARY KEY (id),
+        CONSTRAINT uq_user_quiz_mode UNIQUE (user_id, quiz_mode),
+        FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_user_quiz_mode ON user_quiz_progress (user_id, quiz_mode)",
+    """
+    CREATE TABLE IF NOT EXISTS user_lesson_progress (
+        id BIGSERIAL NOT NULL,
+        user_id BIGINT NOT NULL,
+        lesson_id BIGINT NOT NULL,
+        status VARCHAR(50) NOT NULL,
+        progress_data JSON NOT NULL,
+        started_at TIMESTAMP WITHOUT TIME ZONE,
+        completed_at TIMESTAMP WITHOUT TIME ZONE,
+        last_activity TIMESTAMP WITHOUT TIME ZONE DEFAULT now(),
+        PRIMARY KEY (id),
+        CONSTRAINT uq_user_lesson UNIQUE (user_id, lesson_id),
+        FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE,
+        FOREIGN KEY(lesson_id) REFERENCES lessons (id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_user_lesson ON user_lesson_progress (user_id, lesson_id)",
+    """
+    CREATE TABLE IF NOT EXISTS user_lesson_quiz (
+        id BIGSERIAL NOT NULL,
+        user_id BIGINT NOT NULL,
+        lesson_id BIGINT NOT NULL,
+        attempts INTEGER NOT NULL,
+        last_score INTEGER,
+        passed BOOLEAN NOT NULL,
+        answers JSON NOT NULL,
+        completed_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        CONSTRAINT uq_user_lesson_quiz UNIQUE (user_id, lesson_id),
+        FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE,
+        FOREIGN KEY(lesson_id) REFERENCES lessons (id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_user_lesson_quiz ON user_lesson_quiz (user_id, lesson_id)",
+    """
+    CREATE TABLE IF NOT EXISTS user_skills (
+        id BIGSERIAL NOT NULL,
+        user_id BIGINT NOT NULL,
+        skill_id BIGINT NOT NULL,
+        status VARCHAR(50) NOT NULL,
+        current_streak INTEGER NOT NULL,
+        target_streak INTEGER NOT NULL,
+        last_completed_at TIMESTAMP WITHOUT TIME ZONE,
+        start_date DATE DEFAULT CURRENT_DATE NOT NULL,
+        end_date DATE,
+        in_focus_today BOOLEAN NOT NULL,
+        focus_dates JSON NOT NULL,
+        completed_dates JSON NOT NULL,
+        PRIMARY KEY (id),
+        CONSTRAINT uq_user_skill UNIQUE (user_id, skill_id),
+        FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE,
+        FOREIGN KEY(skill_id) REFERENCES skills (id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_user_skill ON user_skills (user_id, skill_id)",
+]
+
+# В порядке, обратном зависимостям внешних ключей
+TABLES = [
+    'user_skills',
+    'user_lesson_quiz',
+    'user_lesson_progress',
+    'user_quiz_progress',
+    'user_course_progress',
+    'user_achievements',
+    'skills',
+    'lessons',
+    'daily_focus',
+    'users',
+    'quiz_questions',
+    'courses',
+    'achievements',
+]
+
+
+def upgrade() -> None:
+    for statement in STATEMENTS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_table(table)
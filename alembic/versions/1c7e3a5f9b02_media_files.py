@@ -0,0 +1,38 @@
+"""media files: Telegram file_id cache for files uploaded from disk
+
+Revision ID: 1c7e3a5f9b02
+Revises: 0b9a4c1e7d25
+Create Date: 2026-10-18 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c7e3a5f9b02'
+down_revision: Union[str, None] = '0b9a4c1e7d25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS: init_db() создает таблицы по моделям, таблица может уже быть
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS media_files (
+            id BIGSERIAL PRIMARY KEY,
+            path VARCHAR(500) NOT NULL,
+            content_hash VARCHAR(64) NOT NULL,
+            media_type VARCHAR(20) NOT NULL,
+            file_id TEXT NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT uq_media_path_hash UNIQUE (path, content_hash, media_type)
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("media_files")
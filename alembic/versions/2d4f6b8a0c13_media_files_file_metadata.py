@@ -0,0 +1,30 @@
+"""media files: duration and on-disk size/mtime of uploaded files
+
+Revision ID: 2d4f6b8a0c13
+Revises: 1c7e3a5f9b02
+Create Date: 2026-10-18 10:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d4f6b8a0c13'
+down_revision: Union[str, None] = '1c7e3a5f9b02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS: init_db() создает таблицы по моделям, колонки могут уже быть
+    op.execute("ALTER TABLE media_files ADD COLUMN IF NOT EXISTS duration INTEGER")
+    op.execute("ALTER TABLE media_files ADD COLUMN IF NOT EXISTS file_size BIGINT")
+    op.execute("ALTER TABLE media_files ADD COLUMN IF NOT EXISTS file_mtime DOUBLE PRECISION")
+
+
+def downgrade() -> None:
+    op.drop_column("media_files", "file_mtime")
+    op.drop_column("media_files", "file_size")
+    op.drop_column("media_files", "duration")
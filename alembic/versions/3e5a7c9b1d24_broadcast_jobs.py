@@ -0,0 +1,54 @@
+"""broadcast jobs with a per-recipient delivery ledger
+
+Revision ID: 3e5a7c9b1d24
+Revises: 2d4f6b8a0c13
+Create Date: 2026-10-18 11:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e5a7c9b1d24'
+down_revision: Union[str, None] = '2d4f6b8a0c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS: init_db() создает таблицы по моделям, таблицы могут уже быть
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS broadcast_jobs (
+            id BIGSERIAL PRIMARY KEY,
+            payload JSON NOT NULL,
+            filters JSON NOT NULL,
+            dedup_key VARCHAR(100) UNIQUE,
+            status VARCHAR(20) NOT NULL,
+            cursor_user_id BIGINT NOT NULL,
+            sent INTEGER NOT NULL,
+            failed INTEGER NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            started_at TIMESTAMP WITHOUT TIME ZONE,
+            finished_at TIMESTAMP WITHOUT TIME ZONE
+        )
+        """
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS idx_broadcast_job_status ON broadcast_jobs (status)")
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS broadcast_deliveries (
+            job_id BIGINT NOT NULL REFERENCES broadcast_jobs (id) ON DELETE CASCADE,
+            user_id BIGINT NOT NULL,
+            delivered BOOLEAN NOT NULL,
+            PRIMARY KEY (job_id, user_id)
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("broadcast_deliveries")
+    op.drop_table("broadcast_jobs")
@@ -0,0 +1,33 @@
+"""scheduler: last run time of each scheduled job
+
+Revision ID: 5a8c0e2f4b36
+Revises: a3f1c2d4e501
+Create Date: 2026-10-18 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a8c0e2f4b36'
+down_revision: Union[str, None] = 'a3f1c2d4e501'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS: init_db() создает таблицы по моделям, таблица может уже быть
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scheduler_runs (
+            job_name VARCHAR(100) PRIMARY KEY,
+            last_run_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("scheduler_runs")
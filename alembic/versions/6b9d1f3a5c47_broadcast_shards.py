@@ -0,0 +1,44 @@
+"""broadcast shards claimed independently by broadcast workers
+
+Revision ID: 6b9d1f3a5c47
+Revises: b7d2e9f0a612
+Create Date: 2026-10-18 15:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b9d1f3a5c47'
+down_revision: Union[str, None] = 'b7d2e9f0a612'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS: init_db() создает таблицы по моделям, таблица может уже быть
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS broadcast_shards (
+            id BIGSERIAL PRIMARY KEY,
+            job_id BIGINT NOT NULL REFERENCES broadcast_jobs (id) ON DELETE CASCADE,
+            shard_no INTEGER NOT NULL,
+            shard_count INTEGER NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            cursor_user_id BIGINT NOT NULL,
+            sent INTEGER NOT NULL,
+            failed INTEGER NOT NULL,
+            worker_id VARCHAR(100),
+            heartbeat_at TIMESTAMP WITHOUT TIME ZONE,
+            finished_at TIMESTAMP WITHOUT TIME ZONE,
+            CONSTRAINT uq_broadcast_shard UNIQUE (job_id, shard_no)
+        )
+        """
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS idx_broadcast_shard_status ON broadcast_shards (status)")
+
+
+def downgrade() -> None:
+    op.drop_table("broadcast_shards")
@@ -0,0 +1,32 @@
+"""users: reachability columns for broadcast pruning
+
+Revision ID: a3f1c2d4e501
+Revises: 3e5a7c9b1d24
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c2d4e501'
+down_revision: Union[str, None] = '3e5a7c9b1d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS: init_db() создает таблицы по моделям, колонки могут уже быть
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS is_reachable BOOLEAN NOT NULL DEFAULT true")
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS unreachable_reason VARCHAR(50)")
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS unreachable_at TIMESTAMP WITHOUT TIME ZONE")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_users_reachable ON users (id) WHERE is_reachable")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_users_reachable")
+    op.drop_column("users", "unreachable_at")
+    op.drop_column("users", "unreachable_reason")
+    op.drop_column("users", "is_reachable")
@@ -0,0 +1,68 @@
+"""points ledger: append-only log of awarded points rolled up into users.points
+
+Revision ID: a8c2e6f4b359
+Revises: f1b7d3e5a248
+Create Date: 2026-10-18 21:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c2e6f4b359'
+down_revision: Union[str, None] = 'f1b7d3e5a248'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS: init_db() создает таблицы по моделям, таблица может уже быть.
+    # Уже начисленные очки остаются в users.points как свернутая сумма
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS points_ledger (
+            id BIGSERIAL PRIMARY KEY,
+            user_id BIGINT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            delta INTEGER NOT NULL,
+            source VARCHAR(50) NOT NULL,
+            ref_id BIGINT,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now()
+        )
+        """
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_points_ledger_user_id ON points_ledger (user_id, id)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_points_ledger_user ON points_ledger (user_id, created_at)"
+    )
+    # Граница свертки: записи с id <= last_id уже учтены в users.points.
+    # Таблица, созданная init_db(), тоже начинает с 0: ее записи еще не свернуты
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS points_rollup_cursor (
+            id INTEGER PRIMARY KEY,
+            last_id BIGINT NOT NULL DEFAULT 0
+        )
+        """
+    )
+    op.execute("INSERT INTO points_rollup_cursor (id, last_id) VALUES (1, 0) ON CONFLICT DO NOTHING")
+
+
+def downgrade() -> None:
+    # Несвернутые начисления переносим в users.points, чтобы не потерять
+    op.execute(
+        """
+        UPDATE users SET points = users.points + pending.delta
+        FROM (
+            SELECT user_id, SUM(delta) AS delta FROM points_ledger
+            WHERE id > COALESCE((SELECT last_id FROM points_rollup_cursor WHERE id = 1), 0)
+            GROUP BY user_id
+        ) pending
+        WHERE users.id = pending.user_id
+        """
+    )
+    op.drop_table("points_rollup_cursor")
+    op.drop_table("points_ledger")
@@ -0,0 +1,52 @@
+"""users: per-user reminder time and next_reminder_at
+
+Revision ID: b7d2e9f0a612
+Revises: 5a8c0e2f4b36
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e9f0a612'
+down_revision: Union[str, None] = '5a8c0e2f4b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS timezone VARCHAR(64) NOT NULL DEFAULT 'Europe/Moscow'")
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS reminder_time TIME WITHOUT TIME ZONE NOT NULL DEFAULT '20:00'")
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS next_reminder_at TIMESTAMP WITHOUT TIME ZONE")
+    
+    # Время напоминания из settings.daily_reminder
+    op.execute("""
+        UPDATE users
+        SET reminder_time = (settings->>'daily_reminder')::time
+        WHERE settings->>'daily_reminder' ~ '^[0-9]{1,2}:[0-9]{2}$'
+    """)
+    
+    # Ближайшее напоминание в часовом поясе пользователя
+    op.execute("""
+        UPDATE users
+        SET next_reminder_at = CASE
+            WHEN ((now() AT TIME ZONE timezone)::date + reminder_time) AT TIME ZONE timezone > now()
+            THEN (((now() AT TIME ZONE timezone)::date + reminder_time) AT TIME ZONE timezone) AT TIME ZONE 'UTC'
+            ELSE (((now() AT TIME ZONE timezone)::date + 1 + reminder_time) AT TIME ZONE timezone) AT TIME ZONE 'UTC'
+        END
+        WHERE next_reminder_at IS NULL
+    """)
+    
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_next_reminder ON users (next_reminder_at) WHERE is_reachable"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_users_next_reminder")
+    op.drop_column("users", "next_reminder_at")
+    op.drop_column("users", "reminder_time")
+    op.drop_column("users", "timezone")
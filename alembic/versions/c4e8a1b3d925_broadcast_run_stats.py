@@ -0,0 +1,34 @@
+"""broadcast jobs: recipient total and per-run throughput stats
+
+Revision ID: c4e8a1b3d925
+Revises: 6b9d1f3a5c47
+Create Date: 2026-10-18 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1b3d925'
+down_revision: Union[str, None] = '6b9d1f3a5c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS: init_db() создает таблицы по моделям, колонки могут уже быть
+    op.execute("ALTER TABLE broadcast_jobs ADD COLUMN IF NOT EXISTS total INTEGER NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE broadcast_jobs ADD COLUMN IF NOT EXISTS rate_limited INTEGER NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE broadcast_jobs ADD COLUMN IF NOT EXISTS duration_seconds DOUBLE PRECISION")
+    op.execute("ALTER TABLE broadcast_jobs ADD COLUMN IF NOT EXISTS messages_per_second DOUBLE PRECISION")
+    op.execute("ALTER TABLE broadcast_shards ADD COLUMN IF NOT EXISTS rate_limited INTEGER NOT NULL DEFAULT 0")
+
+
+def downgrade() -> None:
+    op.drop_column("broadcast_shards", "rate_limited")
+    op.drop_column("broadcast_jobs", "messages_per_second")
+    op.drop_column("broadcast_jobs", "duration_seconds")
+    op.drop_column("broadcast_jobs", "rate_limited")
+    op.drop_column("broadcast_jobs", "total")
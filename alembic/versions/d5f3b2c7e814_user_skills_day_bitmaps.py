@@ -0,0 +1,90 @@
+"""user skills: day bitmaps instead of JSON date lists
+
+Revision ID: d5f3b2c7e814
+Revises: c4e8a1b3d925
+Create Date: 2026-10-18 18:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f3b2c7e814'
+down_revision: Union[str, None] = 'c4e8a1b3d925'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# старая колонка (JSON-список дат) -> новая (bytea, бит i = start_date + i дней)
+COLUMNS = {
+    "completed_dates": "completed_days",
+    "focus_dates": "focus_days",
+}
+
+
+def _to_bitmap(old: str, new: str) -> str:
+    """
+    UPDATE, который переносит даты из JSON-списка в битовую карту
+
+    Каждый байт собирается из битов своих дней, затем байты склеиваются
+    в hex-строку и декодируются в bytea. Порядок битов совпадает с
+    get_bit/set_bit. Даты раньше start_date отбрасываются.
+    """
+    return f"""
+        WITH days AS (
+            SELECT DISTINCT us.id, d.value::date - us.start_date AS idx
+            FROM user_skills us
+            CROSS JOIN LATERAL json_array_elements_text(us.{old}::json) AS d(value)
+            WHERE us.start_date IS NOT NULL AND d.value::date >= us.start_date
+        ),
+        sizes AS (
+            SELECT id, MAX(idx) / 8 AS last_byte FROM days GROUP BY id
+        ),
+        bytes AS (
+            SELECT s.id, n.n, COALESCE(SUM(1 << (d.idx % 8)), 0) AS value
+            FROM sizes s
+            CROSS JOIN LATERAL generate_series(0, s.last_byte) AS n(n)
+            LEFT JOIN days d ON d.id = s.id AND d.idx / 8 = n.n
+            GROUP BY s.id, n.n
+        )
+        UPDATE user_skills us
+        SET {new} = b.bits
+        FROM (
+            SELECT id, decode(string_agg(lpad(to_hex(value), 2, '0'), '' ORDER BY n), 'hex') AS bits
+            FROM bytes
+            GROUP BY id
+        ) b
+        WHERE b.id = us.id
+    """
+
+
+def _to_dates(new: str, old: str) -> str:
+    """UPDATE, который восстанавливает JSON-список дат из битовой карты"""
+    return f"""
+        UPDATE user_skills
+        SET {old} = COALESCE((
+            SELECT json_agg(to_char(start_date + i, 'YYYY-MM-DD') ORDER BY i)
+            FROM generate_series(0, length({new}) * 8 - 1) AS i
+            WHERE get_bit({new}, i) = 1
+        ), '[]'::json)
+    """
+
+
+def upgrade() -> None:
+    existing = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("user_skills")}
+
+    for old, new in COLUMNS.items():
+        # IF NOT EXISTS: init_db() создает таблицы по моделям, колонки могут уже быть
+        op.execute(f"ALTER TABLE user_skills ADD COLUMN IF NOT EXISTS {new} BYTEA NOT NULL DEFAULT ''::bytea")
+        if old in existing:
+            op.execute(_to_bitmap(old, new))
+            op.drop_column("user_skills", old)
+
+
+def downgrade() -> None:
+    for old, new in COLUMNS.items():
+        op.execute(f"ALTER TABLE user_skills ADD COLUMN IF NOT EXISTS {old} JSON")
+        op.execute(_to_dates(new, old))
+        op.drop_column("user_skills", new)
@@ -0,0 +1,40 @@
+"""progress blobs and user settings: JSON -> JSONB, GIN index on settings
+
+Revision ID: e2a9c4d6f137
+Revises: d5f3b2c7e814
+Create Date: 2026-10-18 19:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a9c4d6f137'
+down_revision: Union[str, None] = 'd5f3b2c7e814'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = [
+    ("users", "settings"),
+    ("user_quiz_progress", "category_stats"),
+    ("user_lesson_progress", "progress_data"),
+    ("user_lesson_quiz", "answers"),
+]
+
+
+def upgrade() -> None:
+    # Повторное приведение jsonb к jsonb ничего не меняет, поэтому миграция
+    # безопасна и для таблиц, созданных init_db() уже с JSONB
+    for table, column in COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_settings ON users USING gin (settings jsonb_path_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_users_settings")
+    for table, column in COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSON USING {column}::json")
@@ -0,0 +1,69 @@
+"""users: notifications_enabled column with partial indexes for reminder recipients
+
+Revision ID: f1b7d3e5a248
+Revises: e2a9c4d6f137
+Create Date: 2026-10-18 20:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b7d3e5a248'
+down_revision: Union[str, None] = 'e2a9c4d6f137'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    # Колонка с константным DEFAULT добавляется без перезаписи таблицы
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS notifications_enabled BOOLEAN NOT NULL DEFAULT true")
+
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM users")).scalar()
+
+    # Перенос из settings пачками по диапазону id, каждая пачка в своей
+    # транзакции: таблица не блокируется на все время миграции.
+    # Переносятся только строки с ключом (включено, если значение 'true').
+    # Строки без ключа остаются с DEFAULT true: так их создает новый код
+    # (init_db() + alembic upgrade head), и это не отключает им напоминания.
+    # Ключ удаляется из settings, чтобы не было двух источников правды
+    with op.get_context().autocommit_block():
+        for start in range(0, max_id + 1, BATCH_SIZE):
+            op.execute(
+                f"""
+                UPDATE users
+                SET notifications_enabled = (settings->>'notifications') IS NOT DISTINCT FROM 'true',
+                    settings = settings - 'notifications'
+                WHERE id >= {start} AND id < {start + BATCH_SIZE}
+                  AND settings ? 'notifications'
+                """
+            )
+
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_settings")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_next_reminder")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_next_reminder ON users (next_reminder_at) "
+            "WHERE is_reachable AND notifications_enabled"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_notify ON users (id) "
+            "WHERE is_reachable AND notifications_enabled"
+        )
+
+
+def downgrade() -> None:
+    op.execute(
+        "UPDATE users SET settings = COALESCE(settings, '{}'::jsonb) "
+        "|| jsonb_build_object('notifications', notifications_enabled)"
+    )
+    op.execute("DROP INDEX IF EXISTS idx_users_notify")
+    op.execute("DROP INDEX IF EXISTS idx_users_next_reminder")
+    op.execute("CREATE INDEX idx_users_next_reminder ON users (next_reminder_at) WHERE is_reachable")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_users_settings ON users USING gin (settings jsonb_path_ops)")
+    op.drop_column("users", "notifications_enabled")
@@ -0,0 +1 @@
+"""Бенчмарки (запуск из корня проекта: python -m benchmarks.<имя>)"""
@@ -0,0 +1,102 @@
+"""
+Сравнение режимов рассылки: текст/фото с parse_mode=HTML и copyMessage
+
+Измеряет работу на нашей стороне для одного получателя: подстановку
+в шаблон и сборку и сериализацию запроса к Bot API, а также размер тела
+запроса. Сеть не используется. В режиме copyMessage Telegram сам берет
+медиа и разметку из исходного сообщения, поэтому запрос не зависит
+от содержимого рассылки.
+
+Запуск: python -m benchmarks.broadcast_modes --recipients 10000
+"""
+import argparse
+import time
+from types import SimpleNamespace
+from typing import Callable, List
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import CopyMessage, CopyMessages, SendMessage, SendPhoto, TelegramMethod
+
+from src.services.broadcast_template import BroadcastTemplate
+
+SAMPLE_TEXT = (
+    "<b>#{name}, сегодня пятница! ✨</b>\n\n"
+    "Пятница — лучший день недели. Не забудьте прочитать суру «Аль-Кахф», "
+    "больше делать салават Пророку ﷺ и искренне делать дуа.\n\n"
+    "У вас {points} очков и {streak} дней подряд — так держать!"
+)
+SAMPLE_FILE_ID = "AgACAgIAAxkBAAIBY2Z" + "x" * 60
+ADMIN_CHAT_ID = 123456789
+FAKE_TOKEN = "123456:FAKE-benchmark-token"
+
+
+def make_recipients(count: int) -> List[SimpleNamespace]:
+    """Получатели с повторяющимися именами, как в реальной базе"""
+    return [
+        SimpleNamespace(
+            telegram_id=100000000 + i,
+            full_name=f"Пользователь {i % 500}",
+            username=None,
+            points=i % 1000,
+            current_streak=i % 30,
+        )
+        for i in range(count)
+    ]
+
+
+def run_mode(
+    name: str,
+    bot: Bot,
+    recipients: List[SimpleNamespace],
+    build: Callable[[SimpleNamespace], TelegramMethod],
+):
+    """
+    Собрать и сериализовать запрос для каждого получателя
+
+    Тело запроса собирается так же, как при отправке (build_form_data
+    сессии бота): поля со значением Default заменяются настройками бота.
+    """
+    total_bytes = 0
+    started = time.perf_counter()
+    for user in recipients:
+        body = bot.session.build_form_data(bot, build(user))()
+        total_bytes += body.size
+    elapsed = time.perf_counter() - started
+
+    count = len(recipients)
+    print(
+        f"{name:<30} {elapsed / count * 1e6:8.1f} мкс/получатель "
+        f"{total_bytes / count:8.0f} байт/запрос "
+        f"{count / elapsed:10.0f} запросов/сек."
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--recipients", type=int, default=10000)
+    args = parser.parse_args()
+
+    bot = Bot(token=FAKE_TOKEN, session=AiohttpSession())
+    recipients = make_recipients(args.recipients)
+    template = BroadcastTemplate(SAMPLE_TEXT, "HTML")
+    album = list(range(1000, 1005))
+
+    print(f"Получателей: {args.recipients}\n")
+    run_mode("sendMessage (HTML-шаблон)", bot, recipients, lambda user: SendMessage(
+        chat_id=user.telegram_id, text=template.render(user), parse_mode="HTML",
+    ))
+    run_mode("sendPhoto (file_id, шаблон)", bot, recipients, lambda user: SendPhoto(
+        chat_id=user.telegram_id, photo=SAMPLE_FILE_ID, caption=template.render(user), parse_mode="HTML",
+    ))
+    run_mode("copyMessage", bot, recipients, lambda user: CopyMessage(
+        chat_id=user.telegram_id, from_chat_id=ADMIN_CHAT_ID, message_id=1000,
+    ))
+    run_mode("copyMessages (альбом из 5)", bot, recipients, lambda user: CopyMessages(
+        chat_id=user.telegram_id, from_chat_id=ADMIN_CHAT_ID, message_ids=album,
+    ))
+    print(f"\nКэш шаблона: {template.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Локальная заглушка Telegram Bot API для нагрузочных тестов
+
+Отвечает на методы отправки так, как это делает Telegram, и умеет
+имитировать его поведение под нагрузкой: задержку ответа, случайные
+RetryAfter (429) и Forbidden (403), а также лимиты скорости на чат
+и на бота в целом.
+
+Подключение бота:
+    TelegramAPIServer.from_base("http://127.0.0.1:8081")
+
+Запуск отдельно:
+    python -m benchmarks.fake_bot_api --port 8081 --latency 40 --retry-after-rate 0.01
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional
+
+from aiohttp import web
+
+BOT_USER = {
+    "id": 123456,
+    "is_bot": True,
+    "first_name": "Fake Bot",
+    "username": "fake_bot",
+}
+
+
+class FakeBotAPI:
+    """Заглушка Bot API с настраиваемыми задержками и ошибками"""
+    def __init__(
+        self,
+        latency_ms: float = 30.0,
+        jitter_ms: float = 10.0,
+        retry_after_rate: float = 0.0,
+        retry_after_seconds: int = 1,
+        forbidden_rate: float = 0.0,
+        chat_limit: Optional[float] = 1.0,
+        global_limit: Optional[float] = 30.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.retry_after_rate = retry_after_rate
+        self.retry_after_seconds = retry_after_seconds
+        self.forbidden_rate = forbidden_rate
+        self.chat_limit = chat_limit  # сообщений в секунду в один чат
+        self.global_limit = global_limit  # сообщений в секунду от бота
+        self.random = random.Random(seed)
+
+        self.stats: Counter = Counter()
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self._chat_last_sent: Dict[int, float] = {}
+        self._recent: Deque[float] = deque()
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=100 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        app.router.add_get("/bot{token}/{method}", self.handle)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8081) -> web.AppRunner:
+        """Запустить сервер в текущем event loop"""
+        runner = web.AppRunner(self.create_app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats))
+
+    async def _params(self, request: web.Request) -> Dict[str, Any]:
+        """Параметры запроса (aiogram отправляет form-data, строки JSON внутри)"""
+        if request.content_type == "application/json":
+            return await request.json()
+        params = {}
+        for key, value in (await request.post()).items():
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+            params[key] = value
+        return params
+
+    def _error(self, code: int, description: str, retry_after: Optional[int] = None) -> web.Response:
+        self.stats[f"error_{code}"] += 1
+        body = {"ok": False, "error_code": code, "description": description}
+        if retry_after is not None:
+            body["parameters"] = {"retry_after": retry_after}
+        return web.json_response(body, status=code)
+
+    def _check_limits(self, chat_id: Optional[int]) -> Optional[int]:
+        """Сколько секунд ждать, если превышен лимит скорости (None — лимит не превышен)"""
+        now = time.monotonic()
+        if self.global_limit:
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.global_limit:
+                return max(1, math.ceil(1.0 - (now - self._recent[0])))
+
+        if self.chat_limit and chat_id is not None:
+            last = self._chat_last_sent.get(chat_id)
+            interval = 1.0 / self.chat_limit
+            if last is not None and now - last < interval:
+                return max(1, math.ceil(interval - (now - last)))
+            self._chat_last_sent[chat_id] = now
+
+        if self.global_limit:
+            self._recent.append(now)
+        return None
+
+    def _message(self, chat_id: int, params: Dict[str, Any]) -> Dict[str, Any]:
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+        }
+        if "text" in params:
+            message["text"] = str(params["text"])
+        if "caption" in params:
+            message["caption"] = str(params["caption"])
+        return message
+
+    def _file(self) -> Dict[str, Any]:
+        number = next(self._file_ids)
+        return {"file_id": f"fake-file-{number}", "file_unique_id": f"fake-unique-{number}"}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.stats["requests"] += 1
+        self.stats[f"method_{method}"] += 1
+
+        params = await self._params(request)
+        delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+        if method == "getMe":
+            return web.json_response({"ok": True, "result": BOT_USER})
+        if method in ("deleteWebhook", "close", "logOut"):
+            return web.json_response({"ok": True, "result": True})
+
+        chat_id = params.get("chat_id")
+        chat_id = int(chat_id) if chat_id is not None else None
+
+        if method.startswith(("send", "copy")):
+            retry_after = self._check_limits(chat_id)
+            if retry_after is None and self.random.random() < self.retry_after_rate:
+                retry_after = self.retry_after_seconds
+            if retry_after is not None:
+                return self._error(429, f"Too Many Requests: retry after {retry_after}", retry_after)
+            if self.random.random() < self.forbidden_rate:
+                return self._error(403, "Forbidden: bot was blocked by the user")
+
+        self.stats["ok"] += 1
+        if method == "copyMessage":
+            result = {"message_id": next(self._message_ids)}
+        elif method == "copyMessages":
+            result = [{"message_id": next(self._message_ids)} for _ in params.get("message_ids", [])]
+        elif method == "sendPhoto":
+            result = self._message(chat_id, params)
+            result["photo"] = [dict(self._file(), width=1280, height=720)]
+        elif method == "sendAudio":
+            result = self._message(chat_id, params)
+            result["audio"] = dict(self._file(), duration=60)
+        elif method == "editMessageText":
+            result = self._message(chat_id, params)
+            result["message_id"] = int(params.get("message_id", 0))
+        else:
+            result = self._message(chat_id or 0, params)
+        return web.json_response({"ok": True, "result": result})
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Параметры заглушки (общие для CLI и бенчмарка)"""
+    parser.add_argument("--latency", type=float, default=30.0, help="средняя задержка ответа, мс")
+    parser.add_argument("--jitter", type=float, default=10.0, help="разброс задержки, мс")
+    parser.add_argument("--retry-after-rate", type=float, default=0.0, help="доля случайных ответов 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after для случайных 429, сек.")
+    parser.add_argument("--forbidden-rate", type=float, default=0.0, help="доля ответов 403 (бот заблокирован)")
+    parser.add_argument("--chat-limit", type=float, default=1.0, help="лимит сообщений в секунду в один чат (0 — без лимита)")
+    parser.add_argument("--global-limit", type=float, default=30.0, help="лимит сообщений в секунду от бота (0 — без лимита)")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def from_arguments(args: argparse.Namespace) -> FakeBotAPI:
+    return FakeBotAPI(
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        retry_after_rate=args.retry_after_rate,
+        retry_after_seconds=args.retry_after,
+        forbidden_rate=args.forbidden_rate,
+        chat_limit=args.chat_limit or None,
+        global_limit=args.global_limit or None,
+        seed=args.seed,
+    )
+
+
+async def _serve(args: argparse.Namespace):
+    api = from_arguments(args)
+    await api.start(args.host, args.port)
+    print(f"Заглушка Bot API: http://{args.host}:{args.port} (статистика: /stats)")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заглушка Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    add_arguments(parser)
+    asyncio.run(_serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
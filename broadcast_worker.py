@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Отдельный воркер рассылок
+
+Разбирает части заданий рассылки вместе с процессом бота. Можно запустить
+несколько копий на одной или разных машинах: части распределяются через
+БД, а общий лимит скорости Telegram соблюдается через Redis.
+"""
+import asyncio
+import logging
+
+from src.bot import create_bot
+from src.config import config
+from src.database.base import init_db
+from src.services.broadcast_job_service import run_shard_worker
+from src.utils.redis_client import close_redis
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    config.validate()
+    await init_db()
+    
+    bot = create_bot()
+    try:
+        await run_shard_worker(bot)
+    finally:
+        await bot.session.close()
+        await close_redis()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,13 +1,15 @@
 """Точка входа бота"""
 import asyncio
 import logging
+from typing import Coroutine, List
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.client.session.aiohttp import AiohttpSession
 
 from src.config import config
-from src.database.base import init_db
+from src.database.base import init_db, watch_session_leaks
+from src.middlewares import DbSessionMiddleware
 from src.handlers import (
     register_start_handlers,
     register_course_handlers,
@@ -18,7 +20,12 @@ from src.handlers import (
     register_quran_handlers,
     register_broadcast_handlers,
 )
+from src.handlers.quran import AUDIO_DIR, SURAS
 from src.services.notification_service import notification_worker
+from src.services.audio_library import build_audio_manifest
+from src.services.identity_cache import listen_identity_invalidations
+from src.services.broadcast_job_service import start_local_worker
+from src.utils.redis_client import close_redis
 
 # Настройка логирования
 logging.basicConfig(
@@ -28,25 +35,31 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def main():
-    """Главная функция"""
-    # Валидация конфигурации
-    try:
-        config.validate()
-    except ValueError as e:
-        logger.error(f"Ошибка конфигурации: {e}")
-        return
-    
-    # Инициализация БД
-    try:
-        logger.info("Инициализация базы данных...")
-        await init_db()
-        logger.info("База данных инициализирована")
-    except Exception as e:
-        logger.error(f"Ошибка инициализации БД: {e}")
+def _log_task_exit(task: asyncio.Task):
+    """Залогировать падение фоновой задачи (отмена при остановке — штатная)"""
+    if task.cancelled():
         return
-    
-    # Создание бота и диспетчера
+    error = task.exception()
+    if error is not None:
+        logger.error(f"Фоновая задача {task.get_name()} завершилась с ошибкой: {error}", exc_info=error)
+
+
+def start_background_task(tasks: List[asyncio.Task], coro: Coroutine, name: str):
+    """Запустить фоновую задачу и сохранить ссылку на нее для остановки"""
+    task = asyncio.create_task(coro, name=name)
+    task.add_done_callback(_log_task_exit)
+    tasks.append(task)
+
+
+async def stop_background_tasks(tasks: List[asyncio.Task]):
+    """Отменить фоновые задачи и дождаться их завершения"""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def create_bot() -> Bot:
+    """Создание бота (с локальным Bot API, если он указан)"""
     # Используем локальный Bot API, если указан
     if config.BOT_API_URL:
         # Для локального Bot API используем TelegramAPIServer
@@ -77,8 +90,34 @@ async def main():
             token=config.BOT_TOKEN,
             default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
         )
+    return bot
+
+
+async def main():
+    """Главная функция"""
+    # Валидация конфигурации
+    try:
+        config.validate()
+    except ValueError as e:
+        logger.error(f"Ошибка конфигурации: {e}")
+        return
+    
+    # Инициализация БД
+    try:
+        logger.info("Инициализация базы данных...")
+        await init_db()
+        logger.info("База данных инициализирована")
+    except Exception as e:
+        logger.error(f"Ошибка инициализации БД: {e}")
+        return
+    
+    # Создание бота и диспетчера
+    bot = create_bot()
     dp = Dispatcher()
     
+    # Одна сессия БД на апдейт для всех обработчиков
+    dp.update.outer_middleware(DbSessionMiddleware())
+    
     # Регистрация обработчиков
     logger.info("Регистрация обработчиков...")
     register_start_handlers(dp)
@@ -90,9 +129,23 @@ async def main():
     register_quran_handlers(dp)
     register_broadcast_handlers(dp)
     
+    background_tasks: List[asyncio.Task] = []
+    
+    # Построение манифеста аудиотеки в фоне (хэширование больших файлов не блокирует запуск)
+    start_background_task(background_tasks, build_audio_manifest(AUDIO_DIR, SURAS), "audio_manifest")
+    
+    # Поиск незакрытых сессий БД
+    start_background_task(background_tasks, watch_session_leaks(), "session_leaks")
+    
+    # Сброс кэша пользователей по сообщениям других экземпляров бота
+    start_background_task(background_tasks, listen_identity_invalidations(), "identity_invalidations")
+    
+    # Воркер рассылок: новые задания и части, брошенные упавшими воркерами
+    start_local_worker(bot)
+    
     # Запуск планировщика уведомлений в фоне
     logger.info("Запуск планировщика уведомлений...")
-    asyncio.create_task(notification_worker(bot))
+    start_background_task(background_tasks, notification_worker(bot), "notification_worker")
     
     # Запуск бота
     logger.info("Запуск бота...")
@@ -101,7 +154,9 @@ async def main():
     except Exception as e:
         logger.error(f"Ошибка при работе бота: {e}")
     finally:
+        await stop_background_tasks(background_tasks)
         await bot.session.close()
+        await close_redis()
 
 
 if __name__ == "__main__":
@@ -12,6 +12,13 @@ from .models import (
     UserQuizProgress,
     Achievement,
     UserAchievement,
+    MediaFile,
+    BroadcastJob,
+    BroadcastDelivery,
+    BroadcastShard,
+    SchedulerRun,
+    PointsLedger,
+    PointsRollupCursor,
 )
 
 __all__ = [
@@ -29,4 +36,11 @@ __all__ = [
     "UserQuizProgress",
     "Achievement",
     "UserAchievement",
+    "MediaFile",
+    "BroadcastJob",
+    "BroadcastDelivery",
+    "BroadcastShard",
+    "SchedulerRun",
+    "PointsLedger",
+    "PointsRollupCursor",
 ]
\ No newline at end of file
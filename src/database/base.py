@@ -1,4 +1,11 @@
 """Базовые классы для работы с БД"""
+import asyncio
+import logging
+import time
+import traceback
+import weakref
+from typing import Dict, Set, Tuple
+
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     AsyncSession,
@@ -7,16 +14,77 @@ from sqlalchemy.ext.asyncio import (
 from sqlalchemy.orm import declarative_base
 from src.config import config
 
+logger = logging.getLogger(__name__)
+
 Base = declarative_base()
 
+# Открытые сессии: id -> (время открытия, где открыта)
+_open_sessions: Dict[int, Tuple[float, str]] = {}
+_reported_sessions: Set[int] = set()
+
+
+def _on_session_collected(session_id: int):
+    """Сессию собрал сборщик мусора, а close() так и не вызвали"""
+    opened = _open_sessions.pop(session_id, None)
+    _reported_sessions.discard(session_id)
+    if opened:
+        logger.warning(
+            f"Сессия БД не была закрыта (прожила {time.monotonic() - opened[0]:.1f} сек.), "
+            f"открыта в:\n{opened[1]}"
+        )
+
+
+class TrackedSession(AsyncSession):
+    """AsyncSession, которая запоминает место открытия для поиска утечек"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if config.DB_LEAK_TIMEOUT > 0:
+            stack = "".join(traceback.format_stack(limit=8)[:-1])
+            _open_sessions[id(self)] = (time.monotonic(), stack)
+            weakref.finalize(self, _on_session_collected, id(self))
+
+    async def close(self):
+        _open_sessions.pop(id(self), None)
+        _reported_sessions.discard(id(self))
+        await super().close()
+
+
+async def watch_session_leaks():
+    """
+    Периодически сообщать о сессиях, открытых дольше DB_LEAK_TIMEOUT
+
+    О каждой сессии сообщается один раз; сессии, которые так и не
+    закрыли, дополнительно попадают в лог при сборке мусора.
+    """
+    timeout = config.DB_LEAK_TIMEOUT
+    if timeout <= 0:
+        return
+    while True:
+        await asyncio.sleep(timeout / 2)
+        now = time.monotonic()
+        for session_id, (opened_at, stack) in list(_open_sessions.items()):
+            if now - opened_at > timeout and session_id not in _reported_sessions:
+                _reported_sessions.add(session_id)
+                logger.warning(
+                    f"Сессия БД открыта {now - opened_at:.0f} сек. (всего открыто: {len(_open_sessions)}), "
+                    f"открыта в:\n{stack}"
+                )
+
+
 engine = create_async_engine(config.DATABASE_URL, echo=False)
 async_session_maker = async_sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
+    engine, class_=TrackedSession, expire_on_commit=False
 )
 
 
 async def get_db_session():
-    """Получить сессию БД (async generator)"""
+    """
+    Получить сессию БД (async generator)
+
+    Устаревший способ: return из цикла async for оставляет генератор
+    незавершенным, и соединение держится до сборки мусора. В обработчиках
+    сессию передает DbSessionMiddleware, в остальном коде — get_session().
+    """
     async with async_session_maker() as session:
         try:
             yield session
@@ -5,16 +5,21 @@ from sqlalchemy import (
     String,
     Text,
     Boolean,
+    Float,
     ForeignKey,
     DateTime,
     Date,
+    Time,
     JSON,
+    LargeBinary,
     UniqueConstraint,
     Index,
 )
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from sqlalchemy.sql import func
-from datetime import datetime, date
+from sqlalchemy.sql import func, text, true
+from datetime import datetime, date, time
 from typing import Optional, Dict, List
 
 from .base import Base
@@ -33,7 +38,14 @@ class User(Base):
     current_streak: Mapped[int] = mapped_column(Integer, default=0)  # дней подряд активности
     longest_streak: Mapped[int] = mapped_column(Integer, default=0)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
-    settings: Mapped[Dict] = mapped_column(JSON, default=lambda: {"notifications": True, "daily_reminder": "20:00"})
+    settings: Mapped[Dict] = mapped_column(MutableDict.as_mutable(JSONB), default=lambda: {"daily_reminder": "20:00"})
+    notifications_enabled: Mapped[bool] = mapped_column(Boolean, default=True, server_default=true())  # напоминания и рассылки
+    is_reachable: Mapped[bool] = mapped_column(Boolean, default=True, server_default=true())  # False, если бот заблокирован
+    unreachable_reason: Mapped[Optional[str]] = mapped_column(String(50))  # 'blocked', 'deactivated', 'chat_not_found'
+    unreachable_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    timezone: Mapped[str] = mapped_column(String(64), default="Europe/Moscow", server_default="Europe/Moscow")
+    reminder_time: Mapped[time] = mapped_column(Time, default=time(20, 0), server_default=text("'20:00'"))  # местное время
+    next_reminder_at: Mapped[Optional[datetime]] = mapped_column(DateTime)  # UTC, следующее вечернее напоминание
     
     # Relationships
     course_progress: Mapped[List["UserCourseProgress"]] = relationship(back_populates="user", cascade="all, delete-orphan")
@@ -41,6 +53,19 @@ class User(Base):
     daily_focus: Mapped[List["DailyFocus"]] = relationship(back_populates="user", cascade="all, delete-orphan")
     quiz_progress: Mapped[List["UserQuizProgress"]] = relationship(back_populates="user", cascade="all, delete-orphan")
     achievements: Mapped[List["UserAchievement"]] = relationship(back_populates="user", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Частичный индекс для выборки получателей рассылок
+        Index("idx_users_reachable", "id", postgresql_where=text("is_reachable")),
+        # Получатели напоминаний: доступны и не отключили уведомления
+        Index("idx_users_notify", "id", postgresql_where=text("is_reachable AND notifications_enabled")),
+        # Выборка пользователей, у которых наступило время напоминания
+        Index(
+            "idx_users_next_reminder",
+            "next_reminder_at",
+            postgresql_where=text("is_reachable AND notifications_enabled"),
+        ),
+    )
 
 
 class Course(Base):
@@ -148,8 +173,9 @@ class UserSkill(Base):
     start_date: Mapped[date] = mapped_column(Date, server_default=func.current_date())
     end_date: Mapped[Optional[date]] = mapped_column(Date)
     in_focus_today: Mapped[bool] = mapped_column(Boolean, default=False)
-    focus_dates: Mapped[List] = mapped_column(JSON, default=lambda: [])  # даты, когда был в фокусе
-    completed_dates: Mapped[List] = mapped_column(JSON, default=lambda: [])  # даты выполнения
+    # Битовые карты дней от start_date (src/utils/day_bitmap.py)
+    focus_days: Mapped[bytes] = mapped_column(LargeBinary, default=b"", server_default=text("''::bytea"))  # дни в фокусе
+    completed_days: Mapped[bytes] = mapped_column(LargeBinary, default=b"", server_default=text("''::bytea"))  # дни выполнения
     
     # Relationships
     user: Mapped["User"] = relationship(back_populates="user_skills")
@@ -214,7 +240,7 @@ class UserQuizProgress(Base):
     total_answered: Mapped[int] = mapped_column(Integer, default=0)
     total_correct: Mapped[int] = mapped_column(Integer, default=0)
     last_played: Mapped[Optional[datetime]] = mapped_column(DateTime)
-    category_stats: Mapped[Dict] = mapped_column(JSON, default=lambda: {})
+    category_stats: Mapped[Dict] = mapped_column(MutableDict.as_mutable(JSONB), default=lambda: {})
     
     # Relationships
     user: Mapped["User"] = relationship(back_populates="quiz_progress")
@@ -262,7 +288,7 @@ class UserLessonProgress(Base):
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     lesson_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("lessons.id", ondelete="CASCADE"), nullable=False)
     status: Mapped[str] = mapped_column(String(50), default="not_started")  # 'not_started', 'studied', 'quiz_passed', 'completed'
-    progress_data: Mapped[Dict] = mapped_column(JSON, default=lambda: {})  # гибкие данные прогресса
+    progress_data: Mapped[Dict] = mapped_column(MutableDict.as_mutable(JSONB), default=lambda: {})  # гибкие данные прогресса
     started_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     last_activity: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
@@ -287,7 +313,7 @@ class UserLessonQuiz(Base):
     attempts: Mapped[int] = mapped_column(Integer, default=0)
     last_score: Mapped[Optional[int]] = mapped_column(Integer)  # процент правильных ответов
     passed: Mapped[bool] = mapped_column(Boolean, default=False)
-    answers: Mapped[Dict] = mapped_column(JSON, default=lambda: {})  # ответы пользователя
+    answers: Mapped[Dict] = mapped_column(MutableDict.as_mutable(JSONB), default=lambda: {})  # ответы пользователя
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     
     # Relationships
@@ -297,4 +323,119 @@ class UserLessonQuiz(Base):
     __table_args__ = (
         UniqueConstraint("user_id", "lesson_id", name="uq_user_lesson_quiz"),
         Index("idx_user_lesson_quiz", "user_id", "lesson_id"),
-    )
\ No newline at end of file
+    )
+
+class MediaFile(Base):
+    """Загруженные в Telegram медиафайлы (кэш file_id)"""
+    __tablename__ = "media_files"
+    
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    path: Mapped[str] = mapped_column(String(500), nullable=False)  # путь относительно корня проекта
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)  # sha256 содержимого
+    media_type: Mapped[str] = mapped_column(String(20), nullable=False)  # 'photo', 'audio'
+    file_id: Mapped[str] = mapped_column(Text, nullable=False)
+    duration: Mapped[Optional[int]] = mapped_column(Integer)  # длительность аудио в секундах
+    file_size: Mapped[Optional[int]] = mapped_column(BigInteger)
+    file_mtime: Mapped[Optional[float]] = mapped_column(Float)  # позволяет не пересчитывать хэш при запуске
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("path", "content_hash", "media_type", name="uq_media_path_hash"),
+    )
+
+
+class BroadcastJob(Base):
+    """Задания массовой рассылки"""
+    __tablename__ = "broadcast_jobs"
+    
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    payload: Mapped[Dict] = mapped_column(JSON, nullable=False)  # text, photo_file_id, photo_path, parse_mode
+    filters: Mapped[Dict] = mapped_column(JSON, default=lambda: {})  # отбор получателей
+    dedup_key: Mapped[Optional[str]] = mapped_column(String(100), unique=True)  # защита от повторного запуска
+    status: Mapped[str] = mapped_column(String(20), default="pending")  # 'pending', 'running', 'completed', 'failed', 'cancelled'
+    cursor_user_id: Mapped[int] = mapped_column(BigInteger, default=0)  # users.id последнего подтвержденного получателя
+    total: Mapped[int] = mapped_column(Integer, default=0, server_default="0")  # получателей на момент создания
+    sent: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    rate_limited: Mapped[int] = mapped_column(Integer, default=0, server_default="0")  # ответов RetryAfter (429)
+    duration_seconds: Mapped[Optional[float]] = mapped_column(Float)
+    messages_per_second: Mapped[Optional[float]] = mapped_column(Float)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    
+    __table_args__ = (
+        Index("idx_broadcast_job_status", "status"),
+    )
+
+
+class BroadcastDelivery(Base):
+    """Журнал доставки рассылки (одна строка на получателя)"""
+    __tablename__ = "broadcast_deliveries"
+    
+    job_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("broadcast_jobs.id", ondelete="CASCADE"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    delivered: Mapped[bool] = mapped_column(Boolean, nullable=False)
+
+
+class BroadcastShard(Base):
+    """Часть задания рассылки: получатели с telegram_id % shard_count == shard_no"""
+    __tablename__ = "broadcast_shards"
+    
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    job_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("broadcast_jobs.id", ondelete="CASCADE"), nullable=False)
+    shard_no: Mapped[int] = mapped_column(Integer, nullable=False)
+    shard_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), default="pending")  # 'pending', 'running', 'completed', 'failed', 'cancelled'
+    cursor_user_id: Mapped[int] = mapped_column(BigInteger, default=0)  # users.id последнего подтвержденного получателя
+    sent: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    rate_limited: Mapped[int] = mapped_column(Integer, default=0, server_default="0")  # ответов RetryAfter (429)
+    worker_id: Mapped[Optional[str]] = mapped_column(String(100))  # воркер, который обрабатывает часть
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime)  # последний сигнал от воркера (UTC)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    
+    __table_args__ = (
+        UniqueConstraint("job_id", "shard_no", name="uq_broadcast_shard"),
+        Index("idx_broadcast_shard_status", "status"),
+    )
+
+
+class SchedulerRun(Base):
+    """Последние запуски задач планировщика"""
+    __tablename__ = "scheduler_runs"
+    
+    job_name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    last_run_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # плановое время запуска (UTC)
+
+
+class PointsLedger(Base):
+    """
+    Журнал начислений очков (только добавление записей)
+
+    users.points — сумма записей с id <= points_rollup_cursor.last_id;
+    точный баланс = users.points + записи после этой границы (см. points_service).
+    """
+    __tablename__ = "points_ledger"
+    
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    delta: Mapped[int] = mapped_column(Integer, nullable=False)
+    source: Mapped[str] = mapped_column(String(50), nullable=False)  # 'quiz', 'skill'
+    ref_id: Mapped[Optional[int]] = mapped_column(BigInteger)  # вопрос, навык и т.п.
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    
+    __table_args__ = (
+        # Несвернутые записи пользователя (id > границы свертки)
+        Index("idx_points_ledger_user_id", "user_id", "id"),
+        # История начислений пользователя
+        Index("idx_points_ledger_user", "user_id", "created_at"),
+    )
+
+
+class PointsRollupCursor(Base):
+    """Граница свертки журнала очков (одна строка, id = 1)"""
+    __tablename__ = "points_rollup_cursor"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    last_id: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")  # последняя свернутая запись журнала
@@ -1,14 +1,19 @@
 """Обработчики для рассылок (только для админов)"""
+import asyncio
 import logging
 from pathlib import Path
+from typing import Awaitable, Dict, List, Set
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 from src.config import config
-from src.services.notification_service import broadcast_message
+from src.database.models import BroadcastJob
+from src.services.notification_service import create_broadcast, create_copy_broadcast
+from src.services.broadcast_job_service import launch_broadcast_job, cancel_broadcast_job
+from src.services.broadcast_progress import track_broadcast_progress
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +24,17 @@ class BroadcastStates(StatesGroup):
     """Состояния для рассылки"""
     waiting_for_message = State()
     waiting_for_photo = State()
+    waiting_for_copy = State()
+
+
+# Сколько ждать остальные сообщения альбома (они приходят отдельными апдейтами)
+ALBUM_COLLECT_DELAY = 1.0
+
+# media_group_id -> message_id альбома, который еще собирается
+_albums: Dict[str, List[int]] = {}
+
+# Задачи отслеживания прогресса (ссылки нужны, чтобы их не собрал GC)
+_progress_tasks: Set[asyncio.Task] = set()
 
 
 def is_admin(telegram_id: int) -> bool:
@@ -38,12 +54,32 @@ async def cmd_broadcast(message: Message, state: FSMContext):
         "Отправьте текст сообщения, которое хотите разослать всем пользователям.\n\n"
         "Используйте HTML для форматирования:\n"
         "<b>жирный</b>, <i>курсив</i>, <code>код</code>\n\n"
+        "Подстановки: {name} — имя, {points} — очки, {streak} — дней подряд\n\n"
+        "Видео, голосовые, документы и альбомы: /broadcast\\_copy\n\n"
         "Или отправьте /cancel для отмены.",
         parse_mode="Markdown"
     )
     await state.set_state(BroadcastStates.waiting_for_message)
 
 
+@router.message(Command("broadcast_copy"))
+async def cmd_broadcast_copy(message: Message, state: FSMContext):
+    """Команда для рассылки копии любого сообщения"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав для выполнения этой команды.")
+        return
+    
+    await message.answer(
+        "📢 **Рассылка копии сообщения**\n\n"
+        "Отправьте сообщение в том виде, в котором его получат пользователи: "
+        "текст с форматированием, фото, видео, голосовое, документ или альбом.\n\n"
+        "Подстановки ({name} и др.) в этом режиме не работают.\n\n"
+        "Или отправьте /cancel для отмены.",
+        parse_mode="Markdown"
+    )
+    await state.set_state(BroadcastStates.waiting_for_copy)
+
+
 @router.message(Command("cancel"))
 async def cmd_cancel(message: Message, state: FSMContext):
     """Отмена рассылки"""
@@ -51,6 +87,91 @@ async def cmd_cancel(message: Message, state: FSMContext):
     await message.answer("❌ Рассылка отменена.")
 
 
+async def start_broadcast(message: Message, create_job: Awaitable[BroadcastJob]):
+    """
+    Запустить рассылку в фоне
+
+    Обработчик не ждет окончания рассылки: ход выполнения показывается
+    в отдельном сообщении, которое обновляется каждые несколько секунд.
+    """
+    try:
+        job = await create_job
+    except Exception as e:
+        logger.error(f"Ошибка создания рассылки: {e}", exc_info=True)
+        await message.answer(
+            f"❌ **Ошибка рассылки:**\n\n{e}",
+            parse_mode="Markdown"
+        )
+        return
+    
+    launch_broadcast_job(message.bot)
+    status = await message.answer(
+        f"⏳ Рассылка #{job.id} запущена. Получателей: {job.total}\n\n"
+        f"Остановить: /broadcast_cancel {job.id}"
+    )
+    task = asyncio.create_task(
+        track_broadcast_progress(message.bot, job.id, status.chat.id, status.message_id)
+    )
+    _progress_tasks.add(task)
+    task.add_done_callback(_progress_tasks.discard)
+
+
+@router.message(Command("broadcast_cancel"))
+async def cmd_broadcast_cancel(message: Message, command: CommandObject):
+    """Остановка идущей рассылки: /broadcast_cancel [номер]"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав для выполнения этой команды.")
+        return
+    
+    job_id = None
+    if command.args:
+        if not command.args.strip().isdigit():
+            await message.answer("Использование: /broadcast_cancel [номер рассылки]")
+            return
+        job_id = int(command.args.strip())
+    
+    cancelled_id = await cancel_broadcast_job(job_id)
+    if cancelled_id is None:
+        await message.answer("Нет активной рассылки для отмены.")
+    else:
+        await message.answer(f"⛔ Рассылка #{cancelled_id} отменена.")
+
+
+@router.message(BroadcastStates.waiting_for_copy, F.media_group_id)
+async def process_broadcast_copy_album(message: Message, state: FSMContext):
+    """Рассылка копии альбома: собираем все его сообщения и копируем одним запросом"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав для выполнения этой команды.")
+        await state.clear()
+        return
+    
+    group_id = message.media_group_id
+    if group_id in _albums:
+        _albums[group_id].append(message.message_id)
+        return
+    
+    _albums[group_id] = [message.message_id]
+    await asyncio.sleep(ALBUM_COLLECT_DELAY)
+    message_ids = _albums.pop(group_id)
+    
+    await state.clear()
+    await message.answer(f"🖼 Альбом получен ({len(message_ids)} шт.). Начинаю рассылку копий...")
+    await start_broadcast(message, create_copy_broadcast(message.chat.id, message_ids))
+
+
+@router.message(BroadcastStates.waiting_for_copy)
+async def process_broadcast_copy(message: Message, state: FSMContext):
+    """Рассылка копии сообщения (copyMessage): Telegram сам переиспользует медиа и разметку"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав для выполнения этой команды.")
+        await state.clear()
+        return
+    
+    await state.clear()
+    await message.answer("📨 Сообщение получено. Начинаю рассылку копий...")
+    await start_broadcast(message, create_copy_broadcast(message.chat.id, [message.message_id]))
+
+
 @router.message(BroadcastStates.waiting_for_message, F.photo)
 async def process_broadcast_with_photo(message: Message, state: FSMContext):
     """Обработка рассылки с фото"""
@@ -75,28 +196,10 @@ async def process_broadcast_with_photo(message: Message, state: FSMContext):
         parse_mode="Markdown"
     )
     
-    # Запускаем рассылку с file_id (проще и надежнее)
-    result = await broadcast_message(
-        message.bot,
-        text=text,
-        photo_file_id=photo_file_id
-    )
-    
-    if result["success"]:
-        await message.answer(
-            f"✅ **Рассылка завершена!**\n\n"
-            f"Отправлено: {result['sent']}\n"
-            f"Ошибок: {result['failed']}\n"
-            f"Всего пользователей: {result['total']}",
-            parse_mode="Markdown"
-        )
-    else:
-        await message.answer(
-            f"❌ **Ошибка рассылки:**\n\n{result.get('error', 'Неизвестная ошибка')}",
-            parse_mode="Markdown"
-        )
-    
     await state.clear()
+    
+    # Запускаем рассылку с file_id (проще и надежнее)
+    await start_broadcast(message, create_broadcast(text, photo_file_id=photo_file_id))
 
 
 @router.message(BroadcastStates.waiting_for_message)
@@ -116,27 +219,10 @@ async def process_broadcast_text(message: Message, state: FSMContext):
         parse_mode="Markdown"
     )
     
-    # Запускаем рассылку
-    result = await broadcast_message(
-        message.bot,
-        text=text
-    )
-    
-    if result["success"]:
-        await message.answer(
-            f"✅ **Рассылка завершена!**\n\n"
-            f"Отправлено: {result['sent']}\n"
-            f"Ошибок: {result['failed']}\n"
-            f"Всего пользователей: {result['total']}",
-            parse_mode="Markdown"
-        )
-    else:
-        await message.answer(
-            f"❌ **Ошибка рассылки:**\n\n{result.get('error', 'Неизвестная ошибка')}",
-            parse_mode="Markdown"
-        )
-    
     await state.clear()
+    
+    # Запускаем рассылку
+    await start_broadcast(message, create_broadcast(text))
 
 
 def register_broadcast_handlers(dp):
@@ -1,135 +1,169 @@
 """Обработчики для прогресса"""
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message
+from datetime import date, timedelta
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.base import get_db_session
-from src.services.user_service import get_user
+from src.database.models import User, UserSkill
+from src.services.identity_cache import UserIdentity
 from src.services.course_service import get_user_course_progress, get_active_courses
 from src.services.skill_service import get_active_user_skills
 from src.services.quiz_service import get_user_quiz_progress
+from src.services.points_service import get_points_balance
+from src.utils.day_bitmap import count_days, current_streak, heatmap, longest_streak
 
 router = Router()
 
+# Сколько последних дней показывать в календаре активности навыков
+ACTIVITY_DAYS = 7
+
+
+def format_skills_activity(user_skills: List[UserSkill]) -> str:
+    """Серии и календарь выполнения навыков (по битовым картам completed_days)"""
+    today = date.today()
+    first = today - timedelta(days=ACTIVITY_DAYS - 1)
+    
+    days_in_row = 0
+    best = 0
+    total = 0
+    active_days = [False] * ACTIVITY_DAYS
+    for user_skill in user_skills:
+        days_in_row = max(days_in_row, current_streak(user_skill.completed_days, user_skill.start_date, today))
+        best = max(best, longest_streak(user_skill.completed_days))
+        total += count_days(user_skill.completed_days)
+        marks = heatmap(user_skill.completed_days, user_skill.start_date, first, today)
+        active_days = [was or mark for was, mark in zip(active_days, marks)]
+    
+    return (
+        f"   Дней подряд: {days_in_row}\n"
+        f"   Лучшая серия: {best}\n"
+        f"   Всего выполнений: {total}\n"
+        f"   Неделя: {''.join('🟩' if day else '⬜' for day in active_days)}\n\n"
+    )
+
 
 @router.message(F.text == "📈 Прогресс")
-async def cmd_menu_progress(message: Message):
+async def cmd_menu_progress(message: Message, session: AsyncSession, identity: Optional[UserIdentity]):
     """Прогресс пользователя (текстовая кнопка)"""
-    async for session in get_db_session():
-        user = await get_user(session, message.from_user.id)
-        if not user:
-            await message.answer("Пользователь не найден")
-            return
-        
-        # Получаем статистику
-        user_skills = await get_active_user_skills(session, user.id)
-        completed_skills = [s for s in user_skills if s.status == "completed"]
-        active_skills = [s for s in user_skills if s.status == "active"]
-        
-        courses = await get_active_courses(session)
-        active_courses_count = 0
-        completed_courses_count = 0
-        
-        for course in courses:
-            progress = await get_user_course_progress(session, user.id, course.id)
-            if progress:
-                if progress.status == "active":
-                    active_courses_count += 1
-                elif progress.status == "completed":
-                    completed_courses_count += 1
-        
-        quiz_progress = await get_user_quiz_progress(session, user.id, "infinite")
-        
-        text = (
-            f"📈 **Ваш прогресс**\n\n"
-            f"💎 Очков: {user.points}\n"
-            f"🔥 Серия: {user.current_streak} дней\n"
-            f"🏆 Лучшая серия: {user.longest_streak} дней\n\n"
-            f"📚 **Курсы:**\n"
-            f"   Активных: {active_courses_count}\n"
-            f"   Завершено: {completed_courses_count}\n\n"
-            f"🛠 **Навыки:**\n"
-            f"   Активных: {len(active_skills)}\n"
-            f"   Завершено: {len(completed_skills)}\n\n"
+    if not identity:
+        await message.answer("Пользователь не найден")
+        return
+    user = await session.get(User, identity.user_id)
+    
+    # Получаем статистику
+    user_skills = await get_active_user_skills(session, user.id)
+    completed_skills = [s for s in user_skills if s.status == "completed"]
+    active_skills = [s for s in user_skills if s.status == "active"]
+    
+    courses = await get_active_courses(session)
+    active_courses_count = 0
+    completed_courses_count = 0
+    
+    for course in courses:
+        progress = await get_user_course_progress(session, user.id, course.id)
+        if progress:
+            if progress.status == "active":
+                active_courses_count += 1
+            elif progress.status == "completed":
+                completed_courses_count += 1
+    
+    quiz_progress = await get_user_quiz_progress(session, user.id, "infinite")
+    points = await get_points_balance(session, user.id)
+    
+    text = (
+        f"📈 **Ваш прогресс**\n\n"
+        f"💎 Очков: {points}\n"
+        f"🔥 Серия: {user.current_streak} дней\n"
+        f"🏆 Лучшая серия: {user.longest_streak} дней\n\n"
+        f"📚 **Курсы:**\n"
+        f"   Активных: {active_courses_count}\n"
+        f"   Завершено: {completed_courses_count}\n\n"
+        f"🛠 **Навыки:**\n"
+        f"   Активных: {len(active_skills)}\n"
+        f"   Завершено: {len(completed_skills)}\n"
+    )
+    text += format_skills_activity(user_skills)
+    
+    if quiz_progress:
+        accuracy = (
+            (quiz_progress.total_correct / quiz_progress.total_answered * 100)
+            if quiz_progress.total_answered > 0
+            else 0
         )
-        
-        if quiz_progress:
-            accuracy = (
-                (quiz_progress.total_correct / quiz_progress.total_answered * 100)
-                if quiz_progress.total_answered > 0
-                else 0
-            )
-            text += (
-                f"🧠 **Тесты:**\n"
-                f"   Отвечено: {quiz_progress.total_answered}\n"
-                f"   Правильно: {quiz_progress.total_correct}\n"
-                f"   Точность: {accuracy:.1f}%\n"
-                f"   Серия: {quiz_progress.current_streak}\n"
-            )
-        
-        await message.answer(
-            text,
-            parse_mode="Markdown",
+        text += (
+            f"🧠 **Тесты:**\n"
+            f"   Отвечено: {quiz_progress.total_answered}\n"
+            f"   Правильно: {quiz_progress.total_correct}\n"
+            f"   Точность: {accuracy:.1f}%\n"
+            f"   Серия: {quiz_progress.current_streak}\n"
         )
+    
+    await message.answer(
+        text,
+        parse_mode="Markdown",
+    )
 
 
 @router.callback_query(F.data == "menu_progress")
-async def callback_menu_progress(callback: CallbackQuery):
+async def callback_menu_progress(callback: CallbackQuery, session: AsyncSession, identity: Optional[UserIdentity]):
     """Прогресс пользователя"""
-    async for session in get_db_session():
-        user = await get_user(session, callback.from_user.id)
-        if not user:
-            await callback.answer("Пользователь не найден", show_alert=True)
-            return
-        
-        # Получаем статистику
-        user_skills = await get_active_user_skills(session, user.id)
-        completed_skills = [s for s in user_skills if s.status == "completed"]
-        active_skills = [s for s in user_skills if s.status == "active"]
-        
-        courses = await get_active_courses(session)
-        active_courses_count = 0
-        completed_courses_count = 0
-        
-        for course in courses:
-            progress = await get_user_course_progress(session, user.id, course.id)
-            if progress:
-                if progress.status == "active":
-                    active_courses_count += 1
-                elif progress.status == "completed":
-                    completed_courses_count += 1
-        
-        quiz_progress = await get_user_quiz_progress(session, user.id, "infinite")
-        
-        text = (
-            f"📈 **Ваш прогресс**\n\n"
-            f"💎 Очков: {user.points}\n"
-            f"🔥 Серия: {user.current_streak} дней\n"
-            f"🏆 Лучшая серия: {user.longest_streak} дней\n\n"
-            f"📚 **Курсы:**\n"
-            f"   Активных: {active_courses_count}\n"
-            f"   Завершено: {completed_courses_count}\n\n"
-            f"🛠 **Навыки:**\n"
-            f"   Активных: {len(active_skills)}\n"
-            f"   Завершено: {len(completed_skills)}\n\n"
+    if not identity:
+        await callback.answer("Пользователь не найден", show_alert=True)
+        return
+    user = await session.get(User, identity.user_id)
+    
+    # Получаем статистику
+    user_skills = await get_active_user_skills(session, user.id)
+    completed_skills = [s for s in user_skills if s.status == "completed"]
+    active_skills = [s for s in user_skills if s.status == "active"]
+    
+    courses = await get_active_courses(session)
+    active_courses_count = 0
+    completed_courses_count = 0
+    
+    for course in courses:
+        progress = await get_user_course_progress(session, user.id, course.id)
+        if progress:
+            if progress.status == "active":
+                active_courses_count += 1
+            elif progress.status == "completed":
+                completed_courses_count += 1
+    
+    quiz_progress = await get_user_quiz_progress(session, user.id, "infinite")
+    points = await get_points_balance(session, user.id)
+    
+    text = (
+        f"📈 **Ваш прогресс**\n\n"
+        f"💎 Очков: {points}\n"
+        f"🔥 Серия: {user.current_streak} дней\n"
+        f"🏆 Лучшая серия: {user.longest_streak} дней\n\n"
+        f"📚 **Курсы:**\n"
+        f"   Активных: {active_courses_count}\n"
+        f"   Завершено: {completed_courses_count}\n\n"
+        f"🛠 **Навыки:**\n"
+        f"   Активных: {len(active_skills)}\n"
+        f"   Завершено: {len(completed_skills)}\n"
+    )
+    text += format_skills_activity(user_skills)
+    
+    if quiz_progress:
+        accuracy = (
+            (quiz_progress.total_correct / quiz_progress.total_answered * 100)
+            if quiz_progress.total_answered > 0
+            else 0
+        )
+        text += (
+            f"🧠 **Тесты:**\n"
+            f"   Отвечено: {quiz_progress.total_answered}\n"
+            f"   Правильно: {quiz_progress.total_correct}\n"
+            f"   Точность: {accuracy:.1f}%\n"
+            f"   Серия: {quiz_progress.current_streak}\n"
         )
-        
-        if quiz_progress:
-            accuracy = (
-                (quiz_progress.total_correct / quiz_progress.total_answered * 100)
-                if quiz_progress.total_answered > 0
-                else 0
-            )
-            text += (
-                f"🧠 **Тесты:**\n"
-                f"   Отвечено: {quiz_progress.total_answered}\n"
-                f"   Правильно: {quiz_progress.total_correct}\n"
-                f"   Точность: {accuracy:.1f}%\n"
-                f"   Серия: {quiz_progress.current_streak}\n"
-            )
-        
-        await callback.message.delete()
-        await callback.message.answer(text, parse_mode="Markdown")
-        await callback.answer()
+    
+    await callback.message.delete()
+    await callback.message.answer(text, parse_mode="Markdown")
+    await callback.answer()
 
 
 def register_progress_handlers(dp):
@@ -2,9 +2,11 @@
 import asyncio
 import logging
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from pathlib import Path
 
+from src.services.audio_library import get_audio_entry, add_audio_entry, send_sura_audio
+
 logger = logging.getLogger(__name__)
 
 router = Router()
@@ -234,38 +236,43 @@ async def callback_sura(callback: CallbackQuery):
         return
     
     sura = SURAS[sura_num]
-    audio_path = AUDIO_DIR / sura["file"]
     
     # Формируем текст с описанием, если оно есть
     text = f"🎧 Сура {sura_num}\n«{sura['name_ar']}» — «{sura['name_ru']}»"
     if sura.get("description"):
         text += f"\n\n{sura['description']}"
     
-    # Проверяем существование файла
-    if not audio_path.exists():
-        logger.error(f"Аудиофайл не найден: {audio_path} (сура {sura_num})")
-        await callback.answer("❌ Аудиофайл не найден на сервере", show_alert=True)
-        return
+    # Файл ищем в манифесте, построенном при запуске (без обращения к диску)
+    entry = get_audio_entry(sura_num)
+    if not entry:
+        audio_path = AUDIO_DIR / sura["file"]
+        if not audio_path.exists():
+            logger.error(f"Аудиофайл не найден: {audio_path} (сура {sura_num})")
+            await callback.answer("❌ Аудиофайл не найден на сервере", show_alert=True)
+            return
+        # Манифест еще строится или файл добавлен после запуска
+        entry = await add_audio_entry(sura_num, audio_path)
     
     # Сохраняем chat_id перед удалением сообщения
     chat_id = callback.message.chat.id
     
-    # Показываем индикатор отправки
     await callback.message.delete()
     loading_message = None
     file_sent = False
     
     try:
-        loading_message = await callback.message.bot.send_message(
-            chat_id=chat_id,
-            text="⏳ Идет отправка файла..."
-        )
+        # Индикатор нужен только при загрузке файла, отправка по file_id мгновенная
+        if not entry.file_id:
+            loading_message = await callback.message.bot.send_message(
+                chat_id=chat_id,
+                text="⏳ Идет отправка файла..."
+            )
         
-        # Отправляем файл
-        audio_file = FSInputFile(audio_path)
-        sent_message = await callback.message.bot.send_audio(
-            chat_id=chat_id,
-            audio=audio_file,
+        # Отправляем файл (по file_id, если он уже есть)
+        sent_message = await send_sura_audio(
+            callback.message.bot,
+            chat_id,
+            entry,
             title=f"Сура {sura_num}. {sura['name_ar']}",
             performer="Толкование ас-Саади",
             caption=text,
@@ -294,11 +301,7 @@ async def callback_sura(callback: CallbackQuery):
     
     # Показываем ошибку только если файл НЕ был отправлен
     if not file_sent:
-        try:
-            file_size = audio_path.stat().st_size / (1024*1024)
-            error_text = f"❌ Ошибка отправки файла.\n\nРазмер файла: {file_size:.1f} MB"
-        except:
-            error_text = "❌ Ошибка отправки файла. Пожалуйста, попробуйте позже."
+        error_text = f"❌ Ошибка отправки файла.\n\nРазмер файла: {entry.size / (1024*1024):.1f} MB"
         
         await callback.message.bot.send_message(
             chat_id=chat_id,
@@ -1,24 +1,39 @@
 """Обработчики для настроек"""
 from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import CallbackQuery, Message
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.keyboards.settings import get_settings_keyboard
+from src.services.identity_cache import UserIdentity
+from src.services.user_service import set_notifications
 
 router = Router()
 
 
-@router.message(F.text == "⚙️ Настройки")
-async def cmd_menu_settings(message: Message):
-    """Настройки (текстовая кнопка)"""
-    text = (
+def get_settings_text(notifications_enabled: bool) -> str:
+    """Текст экрана настроек"""
+    status = "включены" if notifications_enabled else "выключены"
+    return (
         "⚙️ **Настройки**\n\n"
-        "Здесь вы сможете настроить:\n"
-        "🔔 Уведомления\n"
+        f"🔔 Уведомления: {status}\n\n"
+        "Скоро здесь можно будет настроить:\n"
         "⏰ Время напоминаний\n"
-        "🌍 Язык интерфейса\n\n"
-        "Функция в разработке..."
+        "🌍 Язык интерфейса"
     )
+
+
+@router.message(F.text == "⚙️ Настройки")
+async def cmd_menu_settings(message: Message, identity: Optional[UserIdentity]):
+    """Настройки (текстовая кнопка)"""
+    if not identity:
+        await message.answer("Пользователь не найден")
+        return
     
     await message.answer(
-        text,
+        get_settings_text(identity.notifications_enabled),
+        reply_markup=get_settings_keyboard(identity.notifications_enabled),
         parse_mode="Markdown",
     )
 
@@ -42,22 +57,48 @@ async def cmd_menu_library(message: Message):
 
 
 @router.callback_query(F.data == "menu_settings")
-async def callback_menu_settings(callback: CallbackQuery):
+async def callback_menu_settings(callback: CallbackQuery, identity: Optional[UserIdentity]):
     """Настройки"""
-    text = (
-        "⚙️ **Настройки**\n\n"
-        "Здесь вы сможете настроить:\n"
-        "🔔 Уведомления\n"
-        "⏰ Время напоминаний\n"
-        "🌍 Язык интерфейса\n\n"
-        "Функция в разработке..."
-    )
+    if not identity:
+        await callback.answer("Пользователь не найден", show_alert=True)
+        return
     
     await callback.message.delete()
-    await callback.message.answer(text, parse_mode="Markdown")
+    await callback.message.answer(
+        get_settings_text(identity.notifications_enabled),
+        reply_markup=get_settings_keyboard(identity.notifications_enabled),
+        parse_mode="Markdown",
+    )
     await callback.answer()
 
 
+@router.callback_query(F.data == "settings_notifications")
+async def callback_settings_notifications(
+    callback: CallbackQuery,
+    session: AsyncSession,
+    identity: Optional[UserIdentity],
+):
+    """Включить или выключить уведомления"""
+    if not identity:
+        await callback.answer("Пользователь не найден", show_alert=True)
+        return
+    
+    user = await set_notifications(session, identity.user_id, not identity.notifications_enabled)
+    
+    try:
+        await callback.message.edit_text(
+            get_settings_text(user.notifications_enabled),
+            reply_markup=get_settings_keyboard(user.notifications_enabled),
+            parse_mode="Markdown",
+        )
+    except TelegramBadRequest:
+        pass  # сообщение не изменилось (повторное нажатие)
+    
+    await callback.answer(
+        "🔔 Уведомления включены" if user.notifications_enabled else "🔕 Уведомления выключены"
+    )
+
+
 @router.callback_query(F.data == "menu_library")
 async def callback_menu_library(callback: CallbackQuery):
     """Библиотека"""
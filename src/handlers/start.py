@@ -2,8 +2,8 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.base import get_db_session
 from src.services.user_service import get_or_create_user
 from src.keyboards.main_menu import get_main_menu_keyboard
 
@@ -11,32 +11,31 @@ router = Router()
 
 
 @router.message(Command("start"))
-async def cmd_start(message: Message):
+async def cmd_start(message: Message, session: AsyncSession):
     """Команда /start"""
-    async for session in get_db_session():
-        user = await get_or_create_user(
-            session,
-            telegram_id=message.from_user.id,
-            username=message.from_user.username,
-            full_name=message.from_user.full_name,
-            language_code=message.from_user.language_code or "ru",
-        )
-        
-        welcome_text = (
-            f"Ассаляму алейкум, {user.full_name or 'друг'}! 👋\n\n"
-            "Добро пожаловать в **IslamPlus.Practice** — бот для системного развития мусульманина.\n\n"
-            "📚 Изучайте курсы\n"
-            "🛠 Развивайте навыки и привычки\n"
-            "🧠 Проверяйте знания в тестах\n"
-            "📈 Отслеживайте прогресс\n\n"
-            "Выберите раздел из меню:"
-        )
-        
-        await message.answer(
-            welcome_text,
-            reply_markup=get_main_menu_keyboard(),
-            parse_mode="Markdown",
-        )
+    user = await get_or_create_user(
+        session,
+        telegram_id=message.from_user.id,
+        username=message.from_user.username,
+        full_name=message.from_user.full_name,
+        language_code=message.from_user.language_code or "ru",
+    )
+    
+    welcome_text = (
+        f"Ассаляму алейкум, {user.full_name or 'друг'}! 👋\n\n"
+        "Добро пожаловать в **IslamPlus.Practice** — бот для системного развития мусульманина.\n\n"
+        "📚 Изучайте курсы\n"
+        "🛠 Развивайте навыки и привычки\n"
+        "🧠 Проверяйте знания в тестах\n"
+        "📈 Отслеживайте прогресс\n\n"
+        "Выберите раздел из меню:"
+    )
+    
+    await message.answer(
+        welcome_text,
+        reply_markup=get_main_menu_keyboard(),
+        parse_mode="Markdown",
+    )
 
 
 @router.message(Command("menu"))
@@ -1,8 +1,10 @@
 """Клавиатуры для практики"""
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from datetime import date
 from typing import List
 
 from src.database.models import UserSkill
+from src.utils.day_bitmap import has_day
 
 
 def get_practice_keyboard() -> InlineKeyboardMarkup:
@@ -19,12 +21,18 @@ def get_practice_keyboard() -> InlineKeyboardMarkup:
 def get_skills_keyboard(user_skills: List[UserSkill], show_complete: bool = False) -> InlineKeyboardMarkup:
     """Список навыков пользователя"""
     buttons = []
+    today = date.today()
     
     for user_skill in user_skills:
         if user_skill.status == "completed" and not show_complete:
             continue
         
-        status_icon = "✅" if user_skill.status == "completed" else "🔄"
+        if user_skill.status == "completed":
+            status_icon = "✅"
+        elif has_day(user_skill.completed_days, user_skill.start_date, today):
+            status_icon = "☑️"  # уже выполнен сегодня
+        else:
+            status_icon = "🔄"
         progress = f"{user_skill.current_streak}/{user_skill.target_streak}"
         button_text = f"{status_icon} {user_skill.skill.title} ({progress})"
         
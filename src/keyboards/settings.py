@@ -0,0 +1,12 @@
+"""Клавиатуры для настроек"""
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+
+def get_settings_keyboard(notifications_enabled: bool) -> InlineKeyboardMarkup:
+    """Меню настроек"""
+    notifications_text = "🔕 Выключить уведомления" if notifications_enabled else "🔔 Включить уведомления"
+    buttons = [
+        [InlineKeyboardButton(text=notifications_text, callback_data="settings_notifications")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="menu_main")],
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
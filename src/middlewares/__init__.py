@@ -0,0 +1,4 @@
+"""Middleware aiogram"""
+from .db import DbSessionMiddleware
+
+__all__ = ["DbSessionMiddleware"]
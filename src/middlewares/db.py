@@ -0,0 +1,38 @@
+"""Сессия БД на время обработки апдейта"""
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from src.database.base import async_session_maker
+from src.services.identity_cache import resolve_identity
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Открывает ровно одну сессию БД на апдейт
+
+    Обработчики получают ее как аргумент session, а пользователя бота —
+    как identity (UserIdentity из кэша; None, если пользователь еще
+    не нажимал /start). Полную строку User обработчик загружает сам,
+    только если она нужна. После обработчика изменения фиксируются,
+    при исключении откатываются, и сессия закрывается в любом случае,
+    даже при раннем return.
+    """
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with async_session_maker() as session:
+            data["session"] = session
+            from_user = data.get("event_from_user")
+            data["identity"] = await resolve_identity(session, from_user.id) if from_user else None
+            try:
+                result = await handler(event, data)
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+            return result
@@ -0,0 +1,126 @@
+"""Манифест аудиотеки (толкование Корана) и отправка аудио по file_id"""
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.types import Message
+
+from src.database.models import MediaFile
+
+from src.services.media_service import (
+    MediaKey,
+    relative_path,
+    get_media_key,
+    get_cached_media,
+    remember_file_id,
+    remember_file_hash,
+    send_media_by_key,
+    get_cached_file_id,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AudioEntry:
+    """Запись манифеста: один аудиофайл суры"""
+    def __init__(
+        self,
+        sura_num: str,
+        path: Path,
+        size: int,
+        mtime: float,
+        key: MediaKey,
+        file_id: Optional[str] = None,
+        duration: Optional[int] = None,
+    ):
+        self.sura_num = sura_num
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.key = key
+        self.file_id = file_id
+        self.duration = duration
+
+    @property
+    def content_hash(self) -> str:
+        return self.key[1]
+
+
+# Номер суры -> запись манифеста
+_manifest: Dict[str, AudioEntry] = {}
+
+
+async def _make_entry(sura_num: str, path: Path, cached: Dict[str, MediaFile]) -> AudioEntry:
+    """Собрать запись манифеста для одного файла"""
+    stat = path.stat()
+    media = cached.get(relative_path(path))
+    if media and media.file_size == stat.st_size and media.file_mtime == stat.st_mtime:
+        remember_file_hash(path, stat.st_size, stat.st_mtime_ns, media.content_hash)
+
+    key = await get_media_key(path, "audio")
+    if media and media.content_hash != key[1]:
+        # Файл изменился: старый file_id больше не подходит
+        media = None
+
+    entry = AudioEntry(
+        sura_num=sura_num,
+        path=path,
+        size=stat.st_size,
+        mtime=stat.st_mtime,
+        key=key,
+        file_id=media.file_id if media else None,
+        duration=media.duration if media else None,
+    )
+    if entry.file_id:
+        remember_file_id(key, entry.file_id)
+    return entry
+
+
+async def build_audio_manifest(audio_dir: Path, suras: Dict[str, Dict]) -> Dict[str, AudioEntry]:
+    """
+    Построить манифест аудиофайлов (один раз при запуске)
+
+    Для каждой суры запоминаются путь, размер, mtime и хэш файла, а также
+    сохраненный ранее file_id и длительность из таблицы media_files.
+    Если размер и mtime совпадают с сохраненными, файл повторно не хэшируется.
+    """
+    cached = await get_cached_media("audio")
+
+    for sura_num, sura in suras.items():
+        path = audio_dir / sura["file"]
+        if not path.exists():
+            logger.warning(f"Аудиофайл не найден: {path} (сура {sura_num})")
+            continue
+        _manifest[sura_num] = await _make_entry(sura_num, path, cached)
+
+    cached_count = sum(1 for entry in _manifest.values() if entry.file_id)
+    logger.info(f"Манифест аудио построен: {len(_manifest)} файлов, с file_id: {cached_count}")
+    return _manifest
+
+
+async def add_audio_entry(sura_num: str, path: Path) -> AudioEntry:
+    """Добавить в манифест файл, которого не было при запуске"""
+    entry = await _make_entry(sura_num, path, await get_cached_media("audio"))
+    _manifest[sura_num] = entry
+    return entry
+
+
+def get_audio_entry(sura_num: str) -> Optional[AudioEntry]:
+    """Запись манифеста для суры (None, если манифест не построен или файла нет)"""
+    return _manifest.get(sura_num)
+
+
+def is_audio_cached(sura_num: str) -> bool:
+    """Есть ли у суры file_id (отправка без загрузки)"""
+    entry = _manifest.get(sura_num)
+    return bool(entry and entry.file_id)
+
+
+async def send_sura_audio(bot: Bot, chat_id: int, entry: AudioEntry, **kwargs) -> Message:
+    """Отправить аудио суры: по file_id, а если его нет — загрузить и запомнить"""
+    message = await send_media_by_key(bot, chat_id, entry.path, entry.key, **kwargs)
+    entry.file_id = await get_cached_file_id(entry.key)
+    if message.audio:
+        entry.duration = message.audio.duration
+    return message
@@ -0,0 +1,581 @@
+"""Сервис для устойчивых заданий рассылки (с журналом доставки)"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from sqlalchemy import select, update, exists, and_, or_, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+
+from src.config import config
+from src.database.models import BroadcastJob, BroadcastDelivery, BroadcastShard, User
+from src.services.broadcast_service import run_broadcast
+from src.services.broadcast_template import BroadcastTemplate
+from src.services.media_service import send_media_cached
+from src.services.user_service import get_recipient_page
+from src.utils.db import get_session
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent.parent.parent
+
+# Воркер частей рассылок внутри процесса бота
+_local_worker: Optional[asyncio.Task] = None
+# Сигнал воркерам процесса, что появились новые части
+_wakeup: Optional[asyncio.Event] = None
+
+# Части, которые еще могут отправлять сообщения
+_ACTIVE_SHARD_STATUSES = ("pending", "running")
+# Статусы задания, при которых выполняющиеся части останавливаются
+_STOPPED_JOB_STATUSES = ("cancelled", "failed")
+
+
+class DeliveryLedger:
+    """Буфер журнала доставки, который периодически сбрасывается в БД"""
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self._rows: List[Tuple[int, bool]] = []
+        self._lock = asyncio.Lock()
+
+    async def add(self, user_id: int, delivered: bool):
+        self._rows.append((user_id, delivered))
+        if len(self._rows) >= config.BROADCAST_LEDGER_BATCH:
+            await self.flush()
+
+    async def flush(self):
+        """Записать накопленные результаты (повторная запись игнорируется)"""
+        async with self._lock:
+            rows, self._rows = self._rows, []
+            if not rows:
+                return
+            async with get_session() as session:
+                await session.execute(
+                    insert(BroadcastDelivery)
+                    .values([
+                        {"job_id": self.job_id, "user_id": user_id, "delivered": delivered}
+                        for user_id, delivered in rows
+                    ])
+                    .on_conflict_do_nothing()
+                )
+
+
+def _resolve_photo_path(photo_path: Optional[str]) -> Optional[Path]:
+    """Абсолютный путь к фото рассылки (None, если файла нет)"""
+    if not photo_path:
+        return None
+
+    photo_file = Path(photo_path)
+    if not photo_file.is_absolute():
+        photo_file = BASE_DIR / photo_path
+
+    if not photo_file.exists():
+        logger.warning(f"Изображение не найдено: {photo_file} (абсолютный путь)")
+        logger.warning(f"Оригинальный путь: {photo_path}")
+        return None
+    return photo_file
+
+
+def _make_copy_sender(bot: Bot, payload: Dict):
+    """
+    Отправка копии сообщения администратора (copyMessage / copyMessages)
+
+    Telegram сам переиспользует медиа и разметку исходного сообщения:
+    у нас нет ни загрузок, ни разбора HTML для каждого получателя.
+    Подходит для любых сообщений: видео, голосовых, документов, альбомов.
+    """
+    from_chat_id = payload["from_chat_id"]
+    message_ids = payload["message_ids"]
+
+    async def send(user):
+        if len(message_ids) == 1:
+            await bot.copy_message(
+                chat_id=user.telegram_id,
+                from_chat_id=from_chat_id,
+                message_id=message_ids[0],
+            )
+        else:
+            # Альбом копируется одним запросом и остается альбомом
+            await bot.copy_messages(
+                chat_id=user.telegram_id,
+                from_chat_id=from_chat_id,
+                message_ids=message_ids,
+            )
+
+    return send
+
+
+def _make_sender(bot: Bot, payload: Dict):
+    """Функция отправки одному получателю по содержимому задания"""
+    if payload.get("mode") == "copy":
+        return _make_copy_sender(bot, payload)
+
+    parse_mode = payload.get("parse_mode", "HTML")
+    template = BroadcastTemplate(payload["text"], parse_mode)
+    photo_file_id = payload.get("photo_file_id")
+    photo_file = None if photo_file_id else _resolve_photo_path(payload.get("photo_path"))
+
+    async def send(user):
+        # Подставляем данные пользователя в текст ({name}, {points}, {streak})
+        personalized_text = template.render(user)
+
+        if photo_file_id:
+            # Используем file_id напрямую (проще и надежнее)
+            await bot.send_photo(
+                chat_id=user.telegram_id,
+                photo=photo_file_id,
+                caption=personalized_text,
+                parse_mode=parse_mode
+            )
+        elif photo_file:
+            # Используем файл с диска (загружается один раз)
+            await send_media_cached(
+                bot,
+                user.telegram_id,
+                photo_file,
+                "photo",
+                caption=personalized_text,
+                parse_mode=parse_mode
+            )
+        else:
+            # Только текст
+            await bot.send_message(
+                chat_id=user.telegram_id,
+                text=personalized_text,
+                parse_mode=parse_mode
+            )
+
+    return send
+
+
+def _filter_clauses(filters: Dict) -> list:
+    """Условия отбора получателей из filters задания"""
+    clauses = []
+    if filters.get("notifications"):
+        clauses.append(User.notifications_enabled == True)
+    return clauses
+
+
+async def create_broadcast_job(
+    payload: Dict,
+    filters: Optional[Dict] = None,
+    dedup_key: Optional[str] = None,
+) -> BroadcastJob:
+    """
+    Создать задание рассылки
+
+    Задание сразу делится на config.BROADCAST_SHARDS частей, которые
+    независимо разбирают воркеры. Если задание с таким dedup_key уже есть
+    (например, напоминание о пятнице за эту дату), возвращается существующее.
+    """
+    async with get_session() as session:
+        if dedup_key:
+            result = await session.execute(
+                select(BroadcastJob).where(BroadcastJob.dedup_key == dedup_key)
+            )
+            job = result.scalar_one_or_none()
+            if job:
+                return job
+
+        job = BroadcastJob(payload=payload, filters=filters or {}, dedup_key=dedup_key)
+        session.add(job)
+        try:
+            await session.flush()
+        except IntegrityError:
+            # Параллельный запуск успел создать задание с тем же ключом
+            await session.rollback()
+            result = await session.execute(
+                select(BroadcastJob).where(BroadcastJob.dedup_key == dedup_key)
+            )
+            return result.scalar_one()
+
+        job.total = await session.scalar(
+            select(func.count())
+            .select_from(User)
+            .where(User.is_reachable == True, *_filter_clauses(job.filters))
+        )
+        shard_count = max(1, config.BROADCAST_SHARDS)
+        session.add_all([
+            BroadcastShard(job_id=job.id, shard_no=shard_no, shard_count=shard_count)
+            for shard_no in range(shard_count)
+        ])
+        return job
+
+
+async def _fetch_pending_page(shard: BroadcastShard, after_id: int, filters: Dict) -> list:
+    """Следующая страница получателей части, которым задание еще не доставлялось"""
+    not_delivered = ~exists().where(
+        and_(
+            BroadcastDelivery.job_id == shard.job_id,
+            BroadcastDelivery.user_id == User.id,
+        )
+    )
+    in_shard = func.mod(User.telegram_id, shard.shard_count) == shard.shard_no
+    async with get_session() as session:
+        return await get_recipient_page(
+            session,
+            after_id,
+            not_delivered,
+            in_shard,
+            *_filter_clauses(filters),
+            limit=config.BROADCAST_PAGE_SIZE,
+        )
+
+
+def _job_result(job: BroadcastJob) -> dict:
+    """Итог задания в формате, который выводят обработчики рассылок"""
+    return {
+        "success": True,
+        "sent": job.sent,
+        "failed": job.failed,
+        "total": job.sent + job.failed,
+    }
+
+
+def _worker_id() -> str:
+    """Идентификатор воркера: хост и PID процесса"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _get_wakeup() -> asyncio.Event:
+    global _wakeup
+    if _wakeup is None:
+        _wakeup = asyncio.Event()
+    return _wakeup
+
+
+async def claim_shard(worker_id: str) -> Optional[BroadcastShard]:
+    """
+    Забрать свободную часть рассылки
+
+    Берется ожидающая часть или часть, воркер которой давно не присылал
+    heartbeat (процесс упал). FOR UPDATE SKIP LOCKED не дает двум воркерам
+    забрать одну и ту же часть.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=config.BROADCAST_SHARD_TIMEOUT)
+    candidate = (
+        select(BroadcastShard.id)
+        .join(BroadcastJob, BroadcastJob.id == BroadcastShard.job_id)
+        .where(
+            BroadcastJob.status.in_(["pending", "running"]),
+            or_(
+                BroadcastShard.status == "pending",
+                and_(BroadcastShard.status == "running", BroadcastShard.heartbeat_at < stale),
+            ),
+        )
+        .order_by(BroadcastShard.job_id, BroadcastShard.shard_no)
+        .limit(1)
+        .with_for_update(of=BroadcastShard, skip_locked=True)
+        .scalar_subquery()
+    )
+    async with get_session() as session:
+        result = await session.execute(
+            update(BroadcastShard)
+            .where(BroadcastShard.id == candidate)
+            .values(status="running", worker_id=worker_id, heartbeat_at=now)
+            .returning(BroadcastShard)
+        )
+        shard = result.scalar_one_or_none()
+        if shard:
+            await session.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.id == shard.job_id, BroadcastJob.status == "pending")
+                .values(status="running", started_at=datetime.now())
+            )
+        return shard
+
+
+async def _watch_shard(
+    shard: BroadcastShard,
+    worker_id: str,
+    sending: asyncio.Task,
+    cancel_requested: asyncio.Event,
+):
+    """Heartbeat части и остановка отправки, если задание отменено или завершилось с ошибкой"""
+    last_heartbeat = time.monotonic()
+    while True:
+        await asyncio.sleep(config.BROADCAST_POLL_INTERVAL)
+        try:
+            async with get_session() as session:
+                status = await session.scalar(
+                    select(BroadcastJob.status).where(BroadcastJob.id == shard.job_id)
+                )
+                if status in _STOPPED_JOB_STATUSES:
+                    cancel_requested.set()
+                    sending.cancel()
+                    return
+
+                if time.monotonic() - last_heartbeat >= config.BROADCAST_SHARD_TIMEOUT / 4:
+                    await session.execute(
+                        update(BroadcastShard)
+                        .where(BroadcastShard.id == shard.id, BroadcastShard.worker_id == worker_id)
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+                    last_heartbeat = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Ошибка проверки части рассылки #{shard.job_id}/{shard.shard_no}: {e}")
+
+
+async def _close_job(job_id: int) -> bool:
+    """
+    Сохранить итог задания, когда все его части остановились
+
+    Вызывается каждой частью после остановки; итог сохраняет последняя.
+    Статус: cancelled, если задание отменено, failed, если хотя бы одна
+    часть завершилась с ошибкой, иначе completed. Количество отправленных
+    считается по журналу доставки (части сбрасывают его до остановки),
+    число ответов RetryAfter — по частям. Длительность и скорость
+    (сообщений в секунду) сохраняются для сравнения рассылок между собой.
+    """
+    async with get_session() as session:
+        job = await session.get(BroadcastJob, job_id, with_for_update=True)
+        if not job or job.finished_at is not None:
+            return False
+
+        result = await session.execute(
+            select(BroadcastShard.status, func.count())
+            .where(BroadcastShard.job_id == job_id)
+            .group_by(BroadcastShard.status)
+        )
+        shards = dict(result.all())
+        if any(shards.get(status) for status in _ACTIVE_SHARD_STATUSES):
+            return False
+
+        if job.status == "cancelled":
+            status = "cancelled"
+        elif shards.get("failed"):
+            status = "failed"
+        else:
+            status = "completed"
+
+        result = await session.execute(
+            select(BroadcastDelivery.delivered, func.count())
+            .where(BroadcastDelivery.job_id == job_id)
+            .group_by(BroadcastDelivery.delivered)
+        )
+        counts = dict(result.all())
+        rate_limited = await session.scalar(
+            select(func.coalesce(func.sum(BroadcastShard.rate_limited), 0))
+            .where(BroadcastShard.job_id == job_id)
+        )
+
+        finished_at = datetime.now()
+        duration = (finished_at - (job.started_at or finished_at)).total_seconds()
+        job.status = status
+        job.finished_at = finished_at
+        job.sent = counts.get(True, 0)
+        job.failed = counts.get(False, 0)
+        job.rate_limited = rate_limited
+        job.duration_seconds = duration
+        job.messages_per_second = (job.sent + job.failed) / duration if duration > 0 else None
+
+    logger.info(
+        f"Рассылка #{job_id}: {status}. Отправлено: {job.sent}, Ошибок: {job.failed}, "
+        f"RetryAfter: {job.rate_limited}, {job.messages_per_second or 0:.1f} сообщ./сек."
+    )
+    return True
+
+
+async def cancel_broadcast_job(job_id: Optional[int] = None) -> Optional[int]:
+    """
+    Отменить задание рассылки (по умолчанию — последнее активное)
+
+    Ожидающие части и части упавших воркеров снимаются сразу, выполняющиеся
+    останавливаются своими воркерами в течение BROADCAST_POLL_INTERVAL;
+    итог задания сохраняется после остановки последней части. Возвращает
+    id отмененного задания или None, если отменять нечего.
+    """
+    async with get_session() as session:
+        active = BroadcastJob.status.in_(["pending", "running"])
+        if job_id is None:
+            job_id = await session.scalar(
+                select(BroadcastJob.id).where(active).order_by(BroadcastJob.id.desc()).limit(1)
+            )
+            if job_id is None:
+                return None
+
+        cancelled = await session.scalar(
+            update(BroadcastJob)
+            .where(BroadcastJob.id == job_id, active)
+            .values(status="cancelled")
+            .returning(BroadcastJob.id)
+        )
+        if cancelled is None:
+            return None
+
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=config.BROADCAST_SHARD_TIMEOUT)
+        await session.execute(
+            update(BroadcastShard)
+            .where(
+                BroadcastShard.job_id == job_id,
+                or_(
+                    BroadcastShard.status == "pending",
+                    and_(BroadcastShard.status == "running", BroadcastShard.heartbeat_at < stale),
+                ),
+            )
+            .values(status="cancelled", finished_at=datetime.now())
+        )
+
+    await _close_job(job_id)
+    return job_id
+
+
+async def _stop_shard(shard: BroadcastShard, status: str):
+    """Сохранить итоговый статус части и, если она последняя, итог задания"""
+    async with get_session() as session:
+        await session.execute(
+            update(BroadcastShard)
+            .where(BroadcastShard.id == shard.id)
+            .values(status=status, finished_at=datetime.now())
+        )
+    await _close_job(shard.job_id)
+
+
+async def run_shard(bot: Bot, shard: BroadcastShard, worker_id: str):
+    """
+    Выполнить (или продолжить после падения воркера) часть рассылки
+
+    Получатели части обходятся страницами по users.id начиная с сохраненного
+    курсора. Результаты пишутся в журнал доставки по ходу отправки, а курсор
+    сдвигается после каждой страницы, поэтому другой воркер продолжает
+    часть без повторной отправки доставленным.
+    """
+    job_id = shard.job_id
+    async with get_session() as session:
+        job = await session.get(BroadcastJob, job_id)
+        payload, filters = job.payload, job.filters or {}
+
+    send = _make_sender(bot, payload)
+    ledger = DeliveryLedger(job_id)
+    description = f"Рассылка #{job_id} (часть {shard.shard_no + 1}/{shard.shard_count})"
+
+    async def record(user, delivered: bool):
+        await ledger.add(user.id, delivered)
+
+    async def send_pages():
+        cursor = shard.cursor_user_id
+        while True:
+            page = await _fetch_pending_page(shard, cursor, filters)
+            if not page:
+                return
+
+            result = await run_broadcast(page, send, description=description, on_result=record)
+            await ledger.flush()
+            cursor = page[-1].id
+
+            async with get_session() as session:
+                await session.execute(
+                    update(BroadcastShard)
+                    .where(BroadcastShard.id == shard.id)
+                    .values(
+                        cursor_user_id=cursor,
+                        sent=BroadcastShard.sent + result["sent"],
+                        failed=BroadcastShard.failed + result["failed"],
+                        rate_limited=BroadcastShard.rate_limited + result["rate_limited"],
+                    )
+                )
+
+    cancel_requested = asyncio.Event()
+    sending = asyncio.create_task(send_pages())
+    watcher = asyncio.create_task(_watch_shard(shard, worker_id, sending, cancel_requested))
+    try:
+        await sending
+    except asyncio.CancelledError:
+        if not cancel_requested.is_set():
+            raise
+        # Задание остановлено: сохраняем то, что успели отправить
+        await ledger.flush()
+        await _stop_shard(shard, "cancelled")
+        logger.info(f"{description} остановлена: задание отменено или завершилось с ошибкой")
+        return
+    except Exception:
+        # Падает только эта часть: остальные продолжают отправку,
+        # итог задания сохранит последняя остановившаяся часть
+        await ledger.flush()
+        await _stop_shard(shard, "failed")
+        raise
+    finally:
+        watcher.cancel()
+
+    await _stop_shard(shard, "completed")
+
+
+async def run_shard_worker(bot: Bot, worker_id: Optional[str] = None):
+    """
+    Разбирать части рассылок, пока процесс работает
+
+    Запускается в процессе бота и в отдельных процессах broadcast_worker.py.
+    Все воркеры делят общий лимит скорости в Redis, поэтому их можно
+    добавлять, не превышая ограничений Telegram.
+    """
+    worker_id = worker_id or _worker_id()
+    wakeup = _get_wakeup()
+    logger.info(f"Воркер рассылок {worker_id} запущен")
+
+    while True:
+        try:
+            shard = await claim_shard(worker_id)
+        except Exception as e:
+            logger.error(f"Ошибка при получении части рассылки: {e}", exc_info=True)
+            shard = None
+
+        if shard is None:
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=config.BROADCAST_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        try:
+            await run_shard(bot, shard, worker_id)
+        except Exception as e:
+            logger.error(f"Ошибка в части рассылки #{shard.job_id}/{shard.shard_no}: {e}", exc_info=True)
+
+
+def start_local_worker(bot: Bot):
+    """Запустить воркер рассылок в процессе бота (если еще не запущен)"""
+    global _local_worker
+    if _local_worker is None or _local_worker.done():
+        _local_worker = asyncio.create_task(run_shard_worker(bot))
+
+
+async def wait_for_broadcast_job(job_id: int) -> dict:
+    """Дождаться, пока воркеры выполнят задание"""
+    while True:
+        async with get_session() as session:
+            job = await session.get(BroadcastJob, job_id)
+            if not job:
+                return {"success": False, "error": "Задание рассылки не найдено", "sent": 0, "failed": 0, "total": 0}
+            # Итог сохраняется только после остановки всех частей
+            if job.finished_at is not None:
+                if job.status == "completed":
+                    return _job_result(job)
+                reason = "отменена" if job.status == "cancelled" else "завершилась с ошибкой"
+                return {
+                    "success": False,
+                    "error": f"Рассылка #{job_id} {reason}",
+                    "sent": job.sent,
+                    "failed": job.failed,
+                    "total": job.sent + job.failed,
+                }
+        await asyncio.sleep(config.BROADCAST_POLL_INTERVAL)
+
+
+def launch_broadcast_job(bot: Bot):
+    """Передать новое задание воркерам, не дожидаясь итога"""
+    start_local_worker(bot)
+    _get_wakeup().set()
+
+
+async def start_broadcast_job(bot: Bot, job_id: int) -> dict:
+    """Передать задание воркерам (включая воркер этого процесса) и дождаться итога"""
+    launch_broadcast_job(bot)
+    return await wait_for_broadcast_job(job_id)
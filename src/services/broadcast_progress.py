@@ -0,0 +1,136 @@
+"""Отображение хода рассылки для администратора"""
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from sqlalchemy import select, func
+
+from src.config import config
+from src.database.models import BroadcastJob, BroadcastDelivery, BroadcastShard
+from src.services.broadcast_service import get_bucket
+from src.utils.db import get_session
+
+logger = logging.getLogger(__name__)
+
+_FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+_STATUS_TITLES = {
+    "pending": "⏳ Рассылка #{id} в очереди",
+    "running": "📤 Рассылка #{id} идет",
+    "completed": "✅ Рассылка #{id} завершена",
+    "failed": "❌ Рассылка #{id} завершилась с ошибкой",
+    "cancelled": "⛔ Рассылка #{id} отменена",
+}
+
+
+async def get_job_progress(job_id: int) -> Optional[Dict]:
+    """Текущее состояние задания: статус и счетчики по журналу доставки"""
+    async with get_session() as session:
+        job = await session.get(BroadcastJob, job_id)
+        if not job:
+            return None
+
+        result = await session.execute(
+            select(BroadcastDelivery.delivered, func.count())
+            .where(BroadcastDelivery.job_id == job_id)
+            .group_by(BroadcastDelivery.delivered)
+        )
+        counts = dict(result.all())
+        rate_limited = await session.scalar(
+            select(func.coalesce(func.sum(BroadcastShard.rate_limited), 0))
+            .where(BroadcastShard.job_id == job_id)
+        )
+
+    return {
+        "id": job.id,
+        "status": job.status,
+        "sent": counts.get(True, 0),
+        "failed": counts.get(False, 0),
+        "total": job.total,
+        "rate_limited": rate_limited,
+        "messages_per_second": job.messages_per_second,
+        "duration_seconds": job.duration_seconds,
+        "finished": job.finished_at is not None,
+    }
+
+
+def _format_duration(seconds: float) -> str:
+    """Длительность в виде Ч:ММ:СС"""
+    return str(timedelta(seconds=int(seconds)))
+
+
+def format_progress(progress: Dict, speed: float, pause: float) -> str:
+    """Текст статусного сообщения рассылки"""
+    done = progress["sent"] + progress["failed"]
+    total = max(progress["total"], done)
+    lines = [
+        f"<b>{_STATUS_TITLES.get(progress['status'], '{id}').format(id=progress['id'])}</b>",
+        "",
+        f"Отправлено: {progress['sent']}",
+        f"Ошибок: {progress['failed']}",
+        f"Обработано: {done} из {total}" + (f" ({done * 100 // total}%)" if total else ""),
+        f"RetryAfter (429): {progress['rate_limited']}",
+    ]
+
+    if progress["status"] in _FINAL_STATUSES:
+        if progress["duration_seconds"]:
+            lines.append(f"Длительность: {_format_duration(progress['duration_seconds'])}")
+        if progress["messages_per_second"]:
+            lines.append(f"Средняя скорость: {progress['messages_per_second']:.1f} сообщ./сек.")
+        return "\n".join(lines)
+
+    lines.append(f"Скорость: {speed:.1f} сообщ./сек.")
+    if pause > 0:
+        lines.append(f"Пауза Telegram (RetryAfter): {pause:.0f} сек.")
+    if speed > 0 and total > done:
+        lines.append(f"Осталось примерно: {_format_duration((total - done) / speed)}")
+    lines.append("")
+    lines.append(f"Остановить: /broadcast_cancel {progress['id']}")
+    return "\n".join(lines)
+
+
+async def _edit_status(bot: Bot, chat_id: int, message_id: int, text: str):
+    """Обновить статусное сообщение (ошибки редактирования не прерывают рассылку)"""
+    try:
+        await bot.edit_message_text(text, chat_id=chat_id, message_id=message_id, parse_mode="HTML")
+    except TelegramRetryAfter as e:
+        await asyncio.sleep(e.retry_after)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e).lower():
+            logger.warning(f"Не удалось обновить статус рассылки: {e}")
+
+
+async def track_broadcast_progress(bot: Bot, job_id: int, chat_id: int, message_id: int):
+    """
+    Обновлять статусное сообщение рассылки, пока задание не завершится
+
+    Скорость считается по приросту журнала доставки между обновлениями,
+    оставшееся время — по этой скорости и числу получателей задания.
+    """
+    last_done = None
+    last_time = time.monotonic()
+    while True:
+        try:
+            progress = await get_job_progress(job_id)
+            if progress is None:
+                return
+
+            now = time.monotonic()
+            done = progress["sent"] + progress["failed"]
+            speed = (done - last_done) / (now - last_time) if last_done is not None and now > last_time else 0.0
+            last_done, last_time = done, now
+
+            pause = await get_bucket().current_pause()
+            await _edit_status(bot, chat_id, message_id, format_progress(progress, speed, pause))
+
+            # После отмены части еще дописывают журнал доставки: ждем итог
+            if progress["finished"]:
+                return
+        except Exception as e:
+            logger.error(f"Ошибка обновления статуса рассылки #{job_id}: {e}", exc_info=True)
+
+        await asyncio.sleep(config.BROADCAST_PROGRESS_INTERVAL)
@@ -0,0 +1,364 @@
+"""Движок массовых рассылок"""
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, Optional, Union
+
+from aiogram.exceptions import (
+    TelegramRetryAfter,
+    TelegramNetworkError,
+    TelegramServerError,
+    TelegramForbiddenError,
+    TelegramBadRequest,
+)
+
+from redis.exceptions import RedisError
+
+from src.config import config
+from src.services.user_service import mark_users_unreachable
+from src.utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Маркер завершения очереди для воркеров
+_STOP = object()
+
+
+class TokenBucket:
+    """Token bucket для ограничения скорости отправки сообщений"""
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def pause_remaining(self) -> float:
+        """Сколько секунд осталось до снятия паузы"""
+        return max(0.0, self._paused_until - time.monotonic())
+
+    async def current_pause(self) -> float:
+        """Текущая пауза после RetryAfter (для отображения прогресса)"""
+        return self.pause_remaining
+
+    async def pause(self, seconds: float):
+        """Приостановить выдачу токенов всем отправителям (RetryAfter от Telegram)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+    async def acquire(self):
+        """Дождаться свободного токена"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                # Во время паузы токены не накапливаются
+                self._updated = max(self._updated, self._paused_until)
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# Выдача токена: возвращает 0, если токен получен, иначе сколько секунд ждать
+_ACQUIRE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local paused_until = tonumber(redis.call('HGET', KEYS[1], 'paused_until') or '0')
+if now < paused_until then
+    return tostring(paused_until - now)
+end
+
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or capacity)
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated') or now)
+updated = math.max(updated, paused_until)
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+# Пауза для всех воркеров: токены обнуляются до paused_until
+_PAUSE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local paused_until = math.max(
+    tonumber(redis.call('HGET', KEYS[1], 'paused_until') or '0'),
+    now + tonumber(ARGV[1])
+)
+redis.call('HSET', KEYS[1], 'paused_until', tostring(paused_until), 'tokens', '0')
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(paused_until - now)
+"""
+
+# Сколько секунд осталось до конца общей паузы
+_PAUSE_REMAINING_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local paused_until = tonumber(redis.call('HGET', KEYS[1], 'paused_until') or '0')
+return tostring(math.max(0, paused_until - now))
+"""
+
+
+class RedisTokenBucket:
+    """
+    Token bucket в Redis: один лимит скорости на все процессы рассылки
+
+    Состояние (токены, время пополнения, пауза после RetryAfter) хранится
+    в хэше Redis и меняется Lua-скриптами атомарно, время берется с сервера
+    Redis. Если Redis недоступен, используется локальный TokenBucket.
+    """
+    def __init__(self, redis, key: str, rate: float, capacity: Optional[float] = None):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._acquire = redis.register_script(_ACQUIRE_SCRIPT)
+        self._pause = redis.register_script(_PAUSE_SCRIPT)
+        self._pause_remaining = redis.register_script(_PAUSE_REMAINING_SCRIPT)
+        self._paused_until = 0.0
+        self._fallback = TokenBucket(rate, capacity)
+
+    @property
+    def pause_remaining(self) -> float:
+        """Сколько секунд осталось до снятия паузы (по данным этого процесса)"""
+        return max(0.0, self._paused_until - time.monotonic(), self._fallback.pause_remaining)
+
+    async def current_pause(self) -> float:
+        """Текущая общая пауза после RetryAfter (по данным Redis)"""
+        try:
+            return float(await self._pause_remaining(keys=[self.key]))
+        except RedisError:
+            return self.pause_remaining
+
+    async def pause(self, seconds: float):
+        """Приостановить выдачу токенов всем воркерам"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        try:
+            await self._pause(keys=[self.key], args=[seconds])
+        except RedisError as e:
+            logger.warning(f"Redis недоступен, пауза только для этого процесса: {e}")
+            await self._fallback.pause(seconds)
+
+    async def acquire(self):
+        """Дождаться свободного токена в общем bucket"""
+        while True:
+            try:
+                wait = float(await self._acquire(keys=[self.key], args=[self.rate, self.capacity]))
+            except RedisError as e:
+                logger.warning(f"Redis недоступен, используем локальный лимит: {e}")
+                await self._fallback.acquire()
+                return
+
+            if wait <= 0:
+                return
+            if wait > 1 / self.rate:
+                # Ожидание дольше интервала между токенами: действует пауза RetryAfter
+                self._paused_until = max(self._paused_until, time.monotonic() + wait)
+            await asyncio.sleep(wait)
+
+
+_bucket: Optional[Union[TokenBucket, RedisTokenBucket]] = None
+
+
+def get_bucket() -> Union[TokenBucket, RedisTokenBucket]:
+    """Общий для всех рассылок token bucket (в Redis, если он включен)"""
+    global _bucket
+    if _bucket is None:
+        if config.BROADCAST_REDIS_LIMITER:
+            _bucket = RedisTokenBucket(get_redis(), "broadcast:rate", config.BROADCAST_RATE_LIMIT)
+        else:
+            _bucket = TokenBucket(config.BROADCAST_RATE_LIMIT)
+    return _bucket
+
+
+class BroadcastStats:
+    """Счетчики рассылки"""
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.total = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.unreachable = 0
+        # telegram_id -> причина, еще не записанные в БД
+        self.pending_unreachable: Dict[Any, str] = {}
+
+    async def flush_unreachable(self):
+        """Исключить недоступных получателей из следующих рассылок"""
+        pending, self.pending_unreachable = self.pending_unreachable, {}
+        if pending:
+            await mark_users_unreachable(pending)
+
+    def as_result(self) -> dict:
+        """Итог в формате, который выводят обработчики рассылок"""
+        return {
+            "success": True,
+            "sent": self.sent,
+            "failed": self.failed,
+            "total": self.total,
+            "rate_limited": self.rate_limited,
+        }
+
+
+async def _iterate(recipients: Union[Iterable[Any], AsyncIterable[Any]]):
+    """Единый async-обход для списков и асинхронных генераторов"""
+    if hasattr(recipients, "__aiter__"):
+        async for recipient in recipients:
+            yield recipient
+    else:
+        for recipient in recipients:
+            yield recipient
+
+
+def _label(recipient: Any) -> Any:
+    """Идентификатор получателя для логов"""
+    if isinstance(recipient, tuple):
+        return recipient[0]
+    return getattr(recipient, "telegram_id", recipient)
+
+
+def _unreachable_reason(error: Exception) -> Optional[str]:
+    """Причина, по которой получатель больше недоступен (None для прочих ошибок)"""
+    message = str(error).lower()
+    if isinstance(error, TelegramForbiddenError):
+        return "deactivated" if "deactivated" in message else "blocked"
+    if isinstance(error, TelegramBadRequest) and "chat not found" in message:
+        return "chat_not_found"
+    return None
+
+
+async def _deliver(
+    recipient: Any,
+    send: Callable[[Any], Awaitable[Any]],
+    bucket: Union[TokenBucket, RedisTokenBucket],
+    stats: BroadcastStats,
+    max_retries: int,
+    description: str,
+) -> bool:
+    """Доставить одно сообщение с учетом лимитов и повторов"""
+    attempt = 0
+    while True:
+        await bucket.acquire()
+        try:
+            await send(recipient)
+            return True
+        except TelegramRetryAfter as e:
+            # Flood control: останавливаем весь bucket, а не только этого отправителя
+            stats.rate_limited += 1
+            await bucket.pause(e.retry_after)
+            logger.warning(f"{description}: RetryAfter {e.retry_after} сек.")
+            error = e
+        except (TelegramNetworkError, TelegramServerError) as e:
+            await asyncio.sleep(config.BROADCAST_RETRY_BACKOFF * (2 ** attempt))
+            error = e
+        except Exception as e:
+            reason = _unreachable_reason(e)
+            if reason:
+                # Бот заблокирован или чат удален: повторять бессмысленно
+                stats.unreachable += 1
+                stats.pending_unreachable[_label(recipient)] = reason
+                logger.debug(f"{description}: получатель {_label(recipient)} недоступен ({reason})")
+            else:
+                logger.error(f"{description}: ошибка отправки получателю {_label(recipient)}: {e}")
+            return False
+
+        attempt += 1
+        if attempt > max_retries:
+            logger.error(f"{description}: получатель {_label(recipient)} пропущен после {attempt} попыток: {error}")
+            return False
+        stats.retries += 1
+
+
+async def run_broadcast(
+    recipients: Union[Iterable[Any], AsyncIterable[Any]],
+    send: Callable[[Any], Awaitable[Any]],
+    description: str = "Рассылка",
+    concurrency: Optional[int] = None,
+    bucket: Optional[Union[TokenBucket, RedisTokenBucket]] = None,
+    max_retries: Optional[int] = None,
+    on_result: Optional[Callable[[Any, bool], Awaitable[Any]]] = None,
+) -> dict:
+    """
+    Разослать сообщения получателям с несколькими параллельными отправками
+
+    Args:
+        recipients: Получатели (список или асинхронный генератор)
+        send: Корутина отправки одному получателю
+        description: Название рассылки для логов
+        concurrency: Количество одновременных отправок
+        bucket: Ограничитель скорости (по умолчанию общий для процесса)
+        max_retries: Количество повторов при временных ошибках
+        on_result: Корутина, вызываемая с (получатель, доставлено) после каждой отправки
+
+    Returns:
+        {"success": True, "sent": int, "failed": int, "total": int, "rate_limited": int}
+    """
+    concurrency = concurrency or config.BROADCAST_CONCURRENCY
+    bucket = bucket or get_bucket()
+    max_retries = config.BROADCAST_MAX_RETRIES if max_retries is None else max_retries
+
+    stats = BroadcastStats()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def producer():
+        async for recipient in _iterate(recipients):
+            stats.total += 1
+            await queue.put(recipient)
+        for _ in range(concurrency):
+            await queue.put(_STOP)
+
+    async def worker():
+        while True:
+            recipient = await queue.get()
+            if recipient is _STOP:
+                return
+            delivered = await _deliver(recipient, send, bucket, stats, max_retries, description)
+            if delivered:
+                stats.sent += 1
+            else:
+                stats.failed += 1
+            if on_result:
+                await on_result(recipient, delivered)
+            if len(stats.pending_unreachable) >= config.BROADCAST_LEDGER_BATCH:
+                await stats.flush_unreachable()
+
+    started = time.monotonic()
+    tasks = [asyncio.create_task(producer())]
+    tasks.extend(asyncio.create_task(worker()) for _ in range(concurrency))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # При ошибке (или отмене) остальные отправки не должны продолжаться
+        # после выхода из рассылки и расходовать общий лимит скорости
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await stats.flush_unreachable()
+    elapsed = time.monotonic() - started
+
+    logger.info(
+        f"{description} завершена за {elapsed:.1f} сек. "
+        f"Отправлено: {stats.sent}, Ошибок: {stats.failed} "
+        f"(недоступны: {stats.unreachable}), Повторов: {stats.retries} "
+        f"(RetryAfter: {stats.rate_limited})"
+    )
+    return stats.as_result()
@@ -0,0 +1,77 @@
+"""Шаблоны текстов рассылок с подстановкой данных получателя"""
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from aiogram.utils.text_decorations import html_decoration, markdown_decoration
+
+# Поддерживаемые подстановки и как получить значение из строки получателя
+PLACEHOLDERS: Dict[str, Callable[[Any], Any]] = {
+    "name": lambda user: user.full_name or user.username or "друг",
+    "points": lambda user: user.points or 0,
+    "streak": lambda user: user.current_streak or 0,
+}
+
+_PLACEHOLDER_RE = re.compile(r"\{(" + "|".join(PLACEHOLDERS) + r")\}")
+
+
+@lru_cache(maxsize=4096)
+def _escape_html(value: str) -> str:
+    """Экранирование значения для HTML (один раз на каждое значение)"""
+    return html_decoration.quote(value)
+
+
+@lru_cache(maxsize=4096)
+def _escape_markdown_v2(value: str) -> str:
+    """Экранирование значения для MarkdownV2"""
+    return markdown_decoration.quote(value)
+
+
+_ESCAPERS: Dict[Optional[str], Callable[[str], str]] = {
+    "HTML": _escape_html,
+    "MarkdownV2": _escape_markdown_v2,
+}
+
+
+class BroadcastTemplate:
+    """
+    Текст рассылки, разобранный один раз
+
+    Текст разбивается на неизменяемые части и подстановки ({name}, {points},
+    {streak}). Строковые значения экранируются под parse_mode, чтобы имя
+    вроде "<b" не ломало разметку сообщения. Готовые тексты кэшируются по
+    набору значений: получатели с одинаковым именем и счетчиками получают
+    уже собранную строку. Текст без подстановок возвращается как есть.
+    """
+    def __init__(self, text: str, parse_mode: Optional[str] = "HTML", cache_size: int = 4096):
+        self.text = text
+        parts = _PLACEHOLDER_RE.split(text)
+        # split с группой: [текст, имя, текст, имя, ..., текст]
+        self._literals = parts[0::2]
+        self._fields = parts[1::2]
+        self._getters = [PLACEHOLDERS[field] for field in self._fields]
+        self._escape = _ESCAPERS.get(parse_mode, str)
+        self._render_values = lru_cache(maxsize=cache_size)(self._build)
+
+    @property
+    def is_static(self) -> bool:
+        """Текст одинаков для всех получателей"""
+        return not self._fields
+
+    def _build(self, values: Tuple[Any, ...]) -> str:
+        """Собрать текст из значений подстановок"""
+        chunks = [self._literals[0]]
+        for value, literal in zip(values, self._literals[1:]):
+            chunks.append(self._escape(value) if isinstance(value, str) else str(value))
+            chunks.append(literal)
+        return "".join(chunks)
+
+    def render(self, user: Any) -> str:
+        """Текст для получателя (строка с full_name, username, points, current_streak)"""
+        if self.is_static:
+            return self.text
+        return self._render_values(tuple(getter(user) for getter in self._getters))
+
+    def cache_info(self):
+        """Статистика кэша готовых текстов"""
+        return self._render_values.cache_info()
@@ -1,6 +1,7 @@
 """Сервис для работы с курсами"""
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, case
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
 from typing import List, Optional
 
@@ -50,34 +51,31 @@ async def start_course(
     user_id: int,
     course_id: int,
 ) -> UserCourseProgress:
-    """Начать курс"""
-    # Проверяем, не начат ли уже курс
-    result = await session.execute(
-        select(UserCourseProgress).where(
-            and_(
-                UserCourseProgress.user_id == user_id,
-                UserCourseProgress.course_id == course_id,
-            )
-        )
+    """
+    Начать курс
+
+    Один INSERT ... ON CONFLICT: новый прогресс создается, приостановленный
+    или брошенный курс снова становится активным, остальные не меняются.
+    """
+    resumed = UserCourseProgress.status.in_(["paused", "abandoned"])
+    stmt = insert(UserCourseProgress).values(
+        user_id=user_id,
+        course_id=course_id,
+        current_lesson_day=1,
+        status="active",
     )
-    progress = result.scalar_one_or_none()
-    
-    if not progress:
-        progress = UserCourseProgress(
-            user_id=user_id,
-            course_id=course_id,
-            current_lesson_day=1,
-            status="active",
-        )
-        session.add(progress)
-        await session.commit()
-        await session.refresh(progress)
-    elif progress.status == "paused" or progress.status == "abandoned":
-        progress.status = "active"
-        progress.last_activity = datetime.now()
-        await session.commit()
-        await session.refresh(progress)
-    
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_user_course",
+        set_={
+            "status": case((resumed, "active"), else_=UserCourseProgress.status),
+            "last_activity": case((resumed, datetime.now()), else_=UserCourseProgress.last_activity),
+        },
+    )
+    result = await session.scalars(
+        stmt.returning(UserCourseProgress), execution_options={"populate_existing": True}
+    )
+    progress = result.one()
+    await session.commit()
     return progress
 
 
@@ -0,0 +1,187 @@
+"""Кэш соответствия telegram_id -> пользователь бота"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Iterable, Optional, Tuple
+
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import config
+from src.database.models import User
+from src.utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = "identity:{telegram_id}"
+INVALIDATE_CHANNEL = "identity:invalidate"
+
+
+@dataclass(frozen=True)
+class UserIdentity:
+    """То, что нужно обработчикам почти на каждый апдейт"""
+    user_id: int
+    telegram_id: int
+    language_code: str
+    is_reachable: bool
+    notifications_enabled: bool = True
+
+
+class IdentityCache:
+    """
+    LRU-кэш с TTL для telegram_id -> UserIdentity
+
+    Заполняется при регистрации (get_or_create_user) и при первом
+    обращении, сбрасывается при изменении профиля. С redis=True записи
+    дублируются в Redis, а сброс рассылается остальным экземплярам бота
+    через pub/sub, чтобы они не держали устаревшую запись до конца TTL.
+    """
+    def __init__(self, maxsize: int = 10000, ttl: float = 600, redis: bool = False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.redis = redis
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[int, Tuple[float, UserIdentity]]" = OrderedDict()
+
+    def _get_local(self, telegram_id: int) -> Optional[UserIdentity]:
+        item = self._items.get(telegram_id)
+        if item is None:
+            return None
+        expires_at, identity = item
+        if expires_at < time.monotonic():
+            del self._items[telegram_id]
+            return None
+        self._items.move_to_end(telegram_id)
+        return identity
+
+    def _put_local(self, identity: UserIdentity):
+        self._items[identity.telegram_id] = (time.monotonic() + self.ttl, identity)
+        self._items.move_to_end(identity.telegram_id)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def drop_local(self, telegram_ids: Iterable[int]):
+        """Удалить записи только из памяти этого процесса"""
+        for telegram_id in telegram_ids:
+            self._items.pop(telegram_id, None)
+
+    async def get(self, telegram_id: int) -> Optional[UserIdentity]:
+        """Запись из памяти, затем из Redis (без обращения к БД)"""
+        identity = self._get_local(telegram_id)
+        if identity is None and self.redis:
+            try:
+                raw = await get_redis().get(REDIS_KEY.format(telegram_id=telegram_id))
+            except RedisError as e:
+                logger.warning(f"Redis недоступен, кэш пользователей только в памяти: {e}")
+                raw = None
+            if raw:
+                identity = UserIdentity(**json.loads(raw))
+                self._put_local(identity)
+
+        if identity is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return identity
+
+    async def put(self, identity: UserIdentity):
+        """Сохранить запись"""
+        self._put_local(identity)
+        if self.redis:
+            try:
+                await get_redis().set(
+                    REDIS_KEY.format(telegram_id=identity.telegram_id),
+                    json.dumps(asdict(identity)),
+                    ex=int(self.ttl),
+                )
+            except RedisError as e:
+                logger.warning(f"Не удалось сохранить пользователя в Redis: {e}")
+
+    async def invalidate(self, *telegram_ids: int):
+        """Сбросить записи после изменения профиля (во всех экземплярах бота)"""
+        self.drop_local(telegram_ids)
+        if self.redis and telegram_ids:
+            try:
+                redis = get_redis()
+                await redis.delete(*(REDIS_KEY.format(telegram_id=tid) for tid in telegram_ids))
+                await redis.publish(INVALIDATE_CHANNEL, json.dumps(list(telegram_ids)))
+            except RedisError as e:
+                logger.warning(f"Не удалось сбросить пользователей в Redis: {e}")
+
+    def stats(self) -> dict:
+        """Счетчики попаданий и промахов"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+identity_cache = IdentityCache(
+    maxsize=config.IDENTITY_CACHE_SIZE,
+    ttl=config.IDENTITY_CACHE_TTL,
+    redis=config.IDENTITY_CACHE_REDIS,
+)
+
+
+def identity_of(user: User) -> UserIdentity:
+    """UserIdentity для загруженного пользователя"""
+    return UserIdentity(
+        user_id=user.id,
+        telegram_id=user.telegram_id,
+        language_code=user.language_code,
+        is_reachable=user.is_reachable,
+        notifications_enabled=user.notifications_enabled,
+    )
+
+
+async def resolve_identity(session: AsyncSession, telegram_id: int) -> Optional[UserIdentity]:
+    """
+    Пользователь бота по telegram_id
+
+    При промахе кэша читаются только нужные колонки; незарегистрированные
+    пользователи (еще не нажимали /start) не кэшируются.
+    """
+    identity = await identity_cache.get(telegram_id)
+    if identity is not None:
+        return identity
+
+    row = (await session.execute(
+        select(User.id, User.telegram_id, User.language_code, User.is_reachable, User.notifications_enabled)
+        .where(User.telegram_id == telegram_id)
+    )).first()
+    if row is None:
+        return None
+
+    identity = UserIdentity(
+        user_id=row.id,
+        telegram_id=row.telegram_id,
+        language_code=row.language_code,
+        is_reachable=row.is_reachable,
+        notifications_enabled=row.notifications_enabled,
+    )
+    await identity_cache.put(identity)
+    return identity
+
+
+async def listen_identity_invalidations():
+    """Сбрасывать локальные записи по сообщениям других экземпляров бота"""
+    if not identity_cache.redis:
+        return
+    while True:
+        try:
+            pubsub = get_redis().pubsub()
+            await pubsub.subscribe(INVALIDATE_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    identity_cache.drop_local(json.loads(message["data"]))
+        except RedisError as e:
+            logger.warning(f"Подписка на сброс кэша пользователей прервана: {e}")
+            await asyncio.sleep(5)
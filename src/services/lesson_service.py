@@ -1,6 +1,7 @@
 """Сервис для работы с уроками и тестами"""
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, update, and_, case, cast, func, literal, Integer
+from sqlalchemy.dialects.postgresql import JSONB, JSONPATH, insert
 from typing import Optional, Dict, List
 from datetime import datetime
 
@@ -9,6 +10,8 @@ from src.database.models import (
     UserCourseProgress, Skill, UserSkill
 )
 
+PASSING_SCORE = 70  # процент правильных ответов для прохождения теста
+
 
 async def get_user_lesson_progress(
     session: AsyncSession,
@@ -32,26 +35,29 @@ async def mark_lesson_studied(
     user_id: int,
     lesson_id: int,
 ) -> UserLessonProgress:
-    """Отметить урок как изученный"""
-    progress = await get_user_lesson_progress(session, user_id, lesson_id)
-    
-    if not progress:
-        progress = UserLessonProgress(
-            user_id=user_id,
-            lesson_id=lesson_id,
-            status="studied",
-            started_at=datetime.now(),
-            last_activity=datetime.now(),
-        )
-        session.add(progress)
-    else:
-        if progress.status == "not_started":
-            progress.status = "studied"
-            progress.started_at = datetime.now()
-        progress.last_activity = datetime.now()
-    
+    """Отметить урок как изученный (один INSERT ... ON CONFLICT)"""
+    now = datetime.now()
+    not_started = UserLessonProgress.status == "not_started"
+    stmt = insert(UserLessonProgress).values(
+        user_id=user_id,
+        lesson_id=lesson_id,
+        status="studied",
+        started_at=now,
+        last_activity=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_user_lesson",
+        set_={
+            "status": case((not_started, "studied"), else_=UserLessonProgress.status),
+            "started_at": case((not_started, now), else_=UserLessonProgress.started_at),
+            "last_activity": now,
+        },
+    )
+    result = await session.scalars(
+        stmt.returning(UserLessonProgress), execution_options={"populate_existing": True}
+    )
+    progress = result.one()
     await session.commit()
-    await session.refresh(progress)
     return progress
 
 
@@ -70,6 +76,14 @@ async def get_lesson_quiz(
     return None
 
 
+def _correct_answers(answers):
+    """SQL-выражение: число правильных ответов в документе answers"""
+    return func.jsonb_array_length(
+        func.jsonb_path_query_array(answers, cast("$.* ? (@.correct == true)", JSONPATH)),
+        type_=Integer,
+    )
+
+
 async def submit_quiz_answer(
     session: AsyncSession,
     user_id: int,
@@ -101,67 +115,69 @@ async def submit_quiz_answer(
     question = questions[question_index]
     is_correct = question.get("correct") == answer_index
     
-    # Получаем или создаем запись о тесте
-    result = await session.execute(
-        select(UserLessonQuiz).where(
-            and_(
-                UserLessonQuiz.user_id == user_id,
-                UserLessonQuiz.lesson_id == lesson_id,
-            )
-        )
-    )
-    quiz_result = result.scalar_one_or_none()
-    
-    if not quiz_result:
-        quiz_result = UserLessonQuiz(
-            user_id=user_id,
-            lesson_id=lesson_id,
-            attempts=0,
-            answers={},
-        )
-        session.add(quiz_result)
-    
-    # Сохраняем ответ
-    if "answers" not in quiz_result.answers:
-        quiz_result.answers = {}
-    
-    quiz_result.answers[str(question_index)] = {
+    # Ответ дописывается в answers через jsonb ||, а результат считается
+    # по уже дополненному документу — все в одном INSERT ... ON CONFLICT
+    total_questions = len(questions)
+    now = datetime.now()
+    answer = {str(question_index): {
         "answer": answer_index,
         "correct": is_correct,
-        "timestamp": datetime.now().isoformat()
-    }
-    
-    # Подсчитываем результат
-    total_questions = len(questions)
-    correct_answers = sum(
-        1 for ans in quiz_result.answers.values() 
-        if ans.get("correct", False)
+        "timestamp": now.isoformat(),
+    }}
+    answers = func.coalesce(UserLessonQuiz.answers, literal({}, JSONB)).op("||", return_type=JSONB)(
+        literal(answer, JSONB)
     )
+    score = _correct_answers(answers) * 100 // total_questions
+    passed = score >= PASSING_SCORE
+    
+    first_score = int(is_correct) * 100 // total_questions
+    stmt = insert(UserLessonQuiz).values(
+        user_id=user_id,
+        lesson_id=lesson_id,
+        attempts=1,
+        answers=answer,
+        last_score=first_score,
+        passed=first_score >= PASSING_SCORE,
+        completed_at=now if first_score >= PASSING_SCORE else None,
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_user_lesson_quiz",
+        set_={
+            "answers": answers,
+            "attempts": UserLessonQuiz.attempts + 1,
+            "last_score": score,
+            "passed": passed,
+            "completed_at": case((passed, now), else_=UserLessonQuiz.completed_at),
+        },
+    )
+    result = await session.execute(
+        stmt.returning(
+            UserLessonQuiz.last_score,
+            UserLessonQuiz.passed,
+            _correct_answers(UserLessonQuiz.answers),
+        )
+    )
+    score, passed, correct_answers = result.one()
     
-    if is_correct:
-        correct_answers += 1
-    
-    score = int((correct_answers / total_questions) * 100) if total_questions > 0 else 0
-    passed = score >= 70  # 70% для прохождения
-    
-    quiz_result.attempts += 1
-    quiz_result.last_score = score
-    quiz_result.passed = passed
-    
+    # Обновляем прогресс урока
     if passed:
-        quiz_result.completed_at = datetime.now()
+        await session.execute(
+            update(UserLessonProgress)
+            .where(
+                UserLessonProgress.user_id == user_id,
+                UserLessonProgress.lesson_id == lesson_id,
+                UserLessonProgress.status == "studied",
+            )
+            .values(
+                status="quiz_passed",
+                progress_data=func.coalesce(UserLessonProgress.progress_data, literal({}, JSONB)).op(
+                    "||", return_type=JSONB
+                )(func.jsonb_build_object("quiz_passed", True, "quiz_score", score)),
+            )
+            .execution_options(synchronize_session="fetch")
+        )
     
     await session.commit()
-    await session.refresh(quiz_result)
-    
-    # Обновляем прогресс урока
-    lesson_progress = await get_user_lesson_progress(session, user_id, lesson_id)
-    if lesson_progress:
-        if passed and lesson_progress.status == "studied":
-            lesson_progress.status = "quiz_passed"
-            lesson_progress.progress_data["quiz_passed"] = True
-            lesson_progress.progress_data["quiz_score"] = score
-            await session.commit()
     
     return {
         "correct": is_correct,
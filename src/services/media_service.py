@@ -0,0 +1,308 @@
+"""Сервис для кэширования загруженных в Telegram медиафайлов"""
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+from sqlalchemy import select, delete, and_
+from sqlalchemy.dialects.postgresql import insert
+
+from src.config import config
+from src.database.models import MediaFile
+from src.utils.db import get_session
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent.parent.parent
+
+# Ключ кэша: (путь относительно корня проекта, sha256 содержимого, тип медиа)
+MediaKey = Tuple[str, str, str]
+
+# (путь, размер, mtime) -> sha256, чтобы не перечитывать файл при каждой отправке
+_hash_cache: Dict[Tuple[str, int, int], str] = {}
+# Кэш file_id в памяти процесса (копия таблицы media_files)
+_file_ids: Dict[MediaKey, str] = {}
+# Блокировки на файл: хэш и первая загрузка выполняются один раз,
+# одновременные запросы того же файла ждут их результата
+_hash_locks: Dict[str, asyncio.Lock] = {}
+_upload_locks: Dict[MediaKey, asyncio.Lock] = {}
+# Ограничение одновременных загрузок, чтобы большие файлы не забивали канал
+_upload_semaphore: Optional[asyncio.Semaphore] = None
+# Локальный Bot API читает файлы с диска сам; сбрасывается, если пути недоступны серверу
+_local_files_enabled: bool = bool(config.BOT_API_URL) and config.BOT_API_LOCAL_FILES
+
+# Метод Bot и извлечение загруженного объекта из ответа для каждого типа медиа
+_SENDERS = {
+    "photo": ("send_photo", lambda message: message.photo[-1]),
+    "audio": ("send_audio", lambda message: message.audio),
+}
+
+
+def relative_path(path: Path) -> str:
+    """Путь к файлу относительно корня проекта"""
+    path = path.resolve()
+    try:
+        return str(path.relative_to(BASE_DIR.resolve()))
+    except ValueError:
+        return str(path)
+
+
+def _sha256(path: Path) -> str:
+    """Посчитать sha256 файла"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def get_file_hash(path: Path) -> str:
+    """Хэш содержимого файла (пересчитывается только при изменении размера или mtime)"""
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _hash_cache:
+        async with _hash_locks.setdefault(str(path), asyncio.Lock()):
+            if key not in _hash_cache:
+                _hash_cache[key] = await asyncio.to_thread(_sha256, path)
+    return _hash_cache[key]
+
+
+async def get_media_key(path: Path, media_type: str) -> MediaKey:
+    """Ключ кэша для файла"""
+    return (relative_path(path), await get_file_hash(path), media_type)
+
+
+async def get_cached_file_id(key: MediaKey) -> Optional[str]:
+    """Получить сохраненный file_id (сначала из памяти, затем из БД)"""
+    if key in _file_ids:
+        return _file_ids[key]
+
+    path, content_hash, media_type = key
+    async with get_session() as session:
+        result = await session.execute(
+            select(MediaFile.file_id).where(
+                and_(
+                    MediaFile.path == path,
+                    MediaFile.content_hash == content_hash,
+                    MediaFile.media_type == media_type,
+                )
+            )
+        )
+        file_id = result.scalar_one_or_none()
+
+    if file_id:
+        _file_ids[key] = file_id
+    return file_id
+
+
+async def get_cached_media(media_type: str) -> Dict[str, MediaFile]:
+    """Последние сохраненные файлы указанного типа: путь -> MediaFile"""
+    async with get_session() as session:
+        result = await session.execute(
+            select(MediaFile)
+            .where(MediaFile.media_type == media_type)
+            .order_by(MediaFile.id)
+        )
+        return {media.path: media for media in result.scalars().all()}
+
+
+def remember_file_id(key: MediaKey, file_id: str):
+    """Положить известный file_id в кэш процесса (без обращения к БД)"""
+    _file_ids[key] = file_id
+
+
+def remember_file_hash(path: Path, size: int, mtime_ns: int, content_hash: str):
+    """Положить известный хэш файла в кэш процесса (без чтения файла)"""
+    _hash_cache[(str(path), size, mtime_ns)] = content_hash
+
+
+async def save_file_id(
+    key: MediaKey,
+    file_id: str,
+    duration: Optional[int] = None,
+    path: Optional[Path] = None,
+):
+    """Сохранить file_id после успешной загрузки"""
+    _file_ids[key] = file_id
+    stat = path.stat() if path else None
+    media_path, content_hash, media_type = key
+    async with get_session() as session:
+        stmt = insert(MediaFile).values(
+            path=media_path,
+            content_hash=content_hash,
+            media_type=media_type,
+            file_id=file_id,
+            duration=duration,
+            file_size=stat.st_size if stat else None,
+            file_mtime=stat.st_mtime if stat else None,
+        )
+        await session.execute(
+            stmt.on_conflict_do_update(
+                constraint="uq_media_path_hash",
+                set_={
+                    "file_id": stmt.excluded.file_id,
+                    "duration": stmt.excluded.duration,
+                    "file_size": stmt.excluded.file_size,
+                    "file_mtime": stmt.excluded.file_mtime,
+                },
+            )
+        )
+
+
+async def forget_file_id(key: MediaKey, file_id: str):
+    """Удалить file_id, который отклонил Telegram"""
+    if _file_ids.get(key) == file_id:
+        del _file_ids[key]
+    path, content_hash, media_type = key
+    async with get_session() as session:
+        await session.execute(
+            delete(MediaFile).where(
+                and_(
+                    MediaFile.path == path,
+                    MediaFile.content_hash == content_hash,
+                    MediaFile.media_type == media_type,
+                    MediaFile.file_id == file_id,
+                )
+            )
+        )
+
+
+def _is_file_id_error(error: TelegramBadRequest) -> bool:
+    """Ошибка вызвана устаревшим или чужим file_id"""
+    message = str(error).lower()
+    return (
+        "file identifier" in message
+        or "file_id" in message
+        or "file reference" in message
+        or "wrong remote file" in message
+    )
+
+
+def _is_local_file_error(error: TelegramBadRequest) -> bool:
+    """Локальный Bot API не смог прочитать файл по пути file://"""
+    message = str(error).lower()
+    return (
+        "file not found" in message
+        or "file must be non-empty" in message
+        or "invalid file http url" in message
+    )
+
+
+def _get_upload_semaphore() -> asyncio.Semaphore:
+    """Общий семафор загрузок процесса"""
+    global _upload_semaphore
+    if _upload_semaphore is None:
+        _upload_semaphore = asyncio.Semaphore(config.MAX_CONCURRENT_UPLOADS)
+    return _upload_semaphore
+
+
+def _local_file_uri(path: Path) -> str:
+    """URI файла для локального Bot API (с учетом другого корня проекта на сервере)"""
+    path = path.resolve()
+    if config.BOT_API_LOCAL_ROOT:
+        path = Path(config.BOT_API_LOCAL_ROOT) / path.relative_to(BASE_DIR.resolve())
+    return path.as_uri()
+
+
+async def _send_file(bot: Bot, chat_id: int, media_type: str, path: Path, **kwargs) -> Message:
+    """
+    Отправить файл с диска
+
+    С локальным Bot API передается только путь file://, и сервер читает файл
+    сам (без multipart и без лимита 50 MB). Если сервер не видит файл, режим
+    отключается для процесса и файл загружается обычным способом. Остальные
+    ошибки (например, недоступный чат) пробрасываются как есть.
+    """
+    global _local_files_enabled
+    if _local_files_enabled:
+        try:
+            return await _send(bot, chat_id, media_type, _local_file_uri(path), **kwargs)
+        except (TelegramBadRequest, ValueError) as e:
+            if isinstance(e, TelegramBadRequest) and not _is_local_file_error(e):
+                raise
+            _local_files_enabled = False
+            logger.warning(f"Локальный Bot API не может прочитать {path}, переходим на загрузку файлов: {e}")
+
+    return await _send(bot, chat_id, media_type, FSInputFile(path), **kwargs)
+
+
+async def _send(bot: Bot, chat_id: int, media_type: str, media, **kwargs) -> Message:
+    """Отправить медиа нужным методом Bot"""
+    method, _ = _SENDERS[media_type]
+    return await getattr(bot, method)(chat_id, media, **kwargs)
+
+
+async def send_media_cached(
+    bot: Bot,
+    chat_id: int,
+    path: Union[str, Path],
+    media_type: str,
+    **kwargs,
+) -> Message:
+    """
+    Отправить файл с диска, загружая его в Telegram только один раз
+
+    После первой успешной отправки file_id сохраняется в таблице media_files
+    и используется для всех следующих получателей. Файл загружается заново,
+    только если изменилось его содержимое или Telegram отклонил file_id.
+    Одновременные запросы одного и того же файла ждут единственную загрузку
+    и затем отправляются по file_id.
+
+    Args:
+        bot: Экземпляр бота
+        chat_id: Получатель
+        path: Путь к файлу
+        media_type: 'photo' или 'audio'
+        **kwargs: Параметры метода отправки (caption, parse_mode и т.д.)
+    """
+    path = Path(path)
+    key = await get_media_key(path, media_type)
+    return await send_media_by_key(bot, chat_id, path, key, **kwargs)
+
+
+async def send_media_by_key(
+    bot: Bot,
+    chat_id: int,
+    path: Path,
+    key: MediaKey,
+    **kwargs,
+) -> Message:
+    """Отправить файл по заранее вычисленному ключу кэша (без чтения файла, если есть file_id)"""
+    media_type = key[2]
+
+    file_id = await get_cached_file_id(key)
+    if file_id:
+        try:
+            return await _send(bot, chat_id, media_type, file_id, **kwargs)
+        except TelegramBadRequest as e:
+            if not _is_file_id_error(e):
+                raise
+            logger.warning(f"Telegram отклонил file_id для {key[0]}, загружаем заново: {e}")
+            await forget_file_id(key, file_id)
+
+    # Файл загружает только один запрос; остальные ждут блокировку и
+    # отправляют по сохраненному file_id. Если загрузка не удалась,
+    # загружать начнет следующий запрос
+    async with _upload_locks.setdefault(key, asyncio.Lock()):
+        file_id = _file_ids.get(key)
+        if not file_id:
+            return await _upload(bot, chat_id, path, key, **kwargs)
+
+    return await _send(bot, chat_id, media_type, file_id, **kwargs)
+
+
+async def _upload(bot: Bot, chat_id: int, path: Path, key: MediaKey, **kwargs) -> Message:
+    """Загрузить файл и сохранить file_id (вызывается под блокировкой ключа)"""
+    media_type = key[2]
+    async with _get_upload_semaphore():
+        message = await _send_file(bot, chat_id, media_type, path, **kwargs)
+
+    _, extract_media = _SENDERS[media_type]
+    media = extract_media(message)
+    await save_file_id(key, media.file_id, getattr(media, "duration", None), path)
+    logger.info(f"Файл {key[0]} загружен в Telegram, file_id сохранен")
+    return message
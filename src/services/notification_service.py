@@ -1,80 +1,110 @@
 """Сервис для уведомлений"""
-import asyncio
 import logging
-from datetime import datetime, time, date, timedelta
+from datetime import timedelta
 from typing import List, Optional
-from pathlib import Path
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, cast, and_, or_, func, Date, Row
 from aiogram import Bot
-from aiogram.types import FSInputFile
 
 from src.config import config
-from src.database.base import get_db_session
-from src.database.models import User, DailyFocus, UserSkill
-from src.services.user_service import get_user
-from src.services.skill_service import get_daily_focus
+from src.utils.db import get_session
+from src.database.models import User, DailyFocus, BroadcastJob
+from src.services.user_service import iter_recipients, next_reminder_expr
+from src.services.broadcast_service import run_broadcast
+from src.services.broadcast_job_service import create_broadcast_job, start_broadcast_job
+from src.services.scheduler import Scheduler, Schedule, local_today
+from src.services.points_service import rollup_points
 
 logger = logging.getLogger(__name__)
 
 
 async def send_daily_reminders(bot: Bot):
     """Отправка ежедневных напоминаний"""
-    async for session in get_db_session():
-        # Утреннее напоминание (09:00)
-        result = await session.execute(
-            select(User).where(User.settings["notifications"].astext == "true")
+    # Утреннее напоминание (09:00)
+    users = iter_recipients(User.notifications_enabled == True)
+    
+    text = (
+        "🌅 Доброе утро!\n\n"
+        "Не забудьте сформировать фокус на сегодня. "
+        "Навыки в фокусе дают двойные очки! ✨"
+    )
+    
+    async def send(user: Row):
+        await bot.send_message(user.telegram_id, text)
+    
+    await run_broadcast(users, send, description="Утреннее напоминание")
+
+
+async def claim_due_reminders() -> List[Row]:
+    """
+    Забрать пользователей, у которых наступило время вечернего напоминания
+
+    Один запрос: UPDATE по индексу next_reminder_at выбирает всех, чье
+    время уже наступило, и сразу сдвигает им напоминание на следующий день
+    (в их часовом поясе). Затем RETURNING соединяется с daily_focus за
+    местную дату пользователя; выполнившие весь фокус отсекаются.
+
+    Доставка не более одного раза: время сдвигается до отправки и при
+    ошибке не возвращается, поэтому напоминание, которое не удалось
+    отправить (или было прервано перезапуском), пропускается до
+    следующего дня, а повторный запуск не пришлет его дважды.
+    """
+    due = (
+        update(User)
+        .where(
+            User.next_reminder_at <= func.timezone("UTC", func.now()),
+            User.is_reachable == True,
+            User.notifications_enabled == True,
         )
-        users = list(result.scalars().all())
-        
-        for user in users:
-            try:
-                text = (
-                    "🌅 Доброе утро!\n\n"
-                    "Не забудьте сформировать фокус на сегодня. "
-                    "Навыки в фокусе дают двойные очки! ✨"
-                )
-                await bot.send_message(user.telegram_id, text)
-                await asyncio.sleep(0.05)  # Защита от лимитов API
-            except Exception as e:
-                print(f"Ошибка отправки уведомления пользователю {user.telegram_id}: {e}")
+        .values(next_reminder_at=next_reminder_expr())
+        .returning(User.id, User.telegram_id, User.timezone)
+        .cte("due")
+    )
+    
+    total_count = func.coalesce(func.json_array_length(DailyFocus.skill_ids), 0)
+    completed_count = func.coalesce(func.json_array_length(DailyFocus.completed_skill_ids), 0)
+    user_today = cast(func.timezone(due.c.timezone, func.now()), Date)
+    
+    stmt = (
+        select(
+            due.c.telegram_id,
+            completed_count.label("completed_count"),
+            total_count.label("total_count"),
+        )
+        .select_from(due)
+        .outerjoin(
+            DailyFocus,
+            and_(DailyFocus.user_id == due.c.id, DailyFocus.date == user_today),
+        )
+        .where(
+            or_(total_count == 0, completed_count < total_count),
+        )
+    )
+    
+    async with get_session() as session:
+        result = await session.execute(stmt)
+        return result.all()
 
 
 async def send_evening_reminders(bot: Bot):
-    """Отправка вечерних напоминаний"""
-    async for session in get_db_session():
-        result = await session.execute(
-            select(User).where(User.settings["notifications"].astext == "true")
-        )
-        users = list(result.scalars().all())
-        
-        for user in users:
-            try:
-                # Проверяем, выполнены ли навыки в фокусе
-                today_focus = await get_daily_focus(session, user.id, date.today())
-                
-                if today_focus and today_focus.skill_ids:
-                    completed_count = len(today_focus.completed_skill_ids)
-                    total_count = len(today_focus.skill_ids)
-                    
-                    if completed_count < total_count:
-                        text = (
-                            "🌙 Добрый вечер!\n\n"
-                            f"Подведите итоги дня! "
-                            f"Выполнено навыков в фокусе: {completed_count}/{total_count}\n\n"
-                            "Отметьте выполненные задания для получения очков! ✨"
-                        )
-                        await bot.send_message(user.telegram_id, text)
-                else:
-                    text = (
-                        "🌙 Добрый вечер!\n\n"
-                        "Подведите итоги дня! Отметьте выполненные задания."
-                    )
-                    await bot.send_message(user.telegram_id, text)
-                
-                await asyncio.sleep(0.05)
-            except Exception as e:
-                print(f"Ошибка отправки уведомления пользователю {user.telegram_id}: {e}")
+    """Отправка вечерних напоминаний тем, у кого наступило время напоминания"""
+    async def send(target: Row):
+        if target.total_count:
+            text = (
+                "🌙 Добрый вечер!\n\n"
+                f"Подведите итоги дня! "
+                f"Выполнено навыков в фокусе: {target.completed_count}/{target.total_count}\n\n"
+                "Отметьте выполненные задания для получения очков! ✨"
+            )
+        else:
+            text = (
+                "🌙 Добрый вечер!\n\n"
+                "Подведите итоги дня! Отметьте выполненные задания."
+            )
+        await bot.send_message(target.telegram_id, text)
+    
+    targets = await claim_due_reminders()
+    if targets:
+        await run_broadcast(targets, send, description="Вечернее напоминание")
 
 
 async def send_streak_reminder(bot: Bot, user_id: int, streak_days: int):
@@ -127,161 +157,91 @@ async def send_lesson_unlocked_notification(
         print(f"Ошибка отправки уведомления об уроке: {e}")
 
 
-async def get_all_users() -> List[User]:
-    """Получить всех пользователей из БД"""
-    users = []
-    async for session in get_db_session():
-        result = await session.execute(select(User))
-        users = list(result.scalars().all())
-        break
-    return users
-
-
 async def send_fasting_reminder(bot: Bot):
     """Отправка напоминания о посте (воскресенье и среда в 6:00 МСК)"""
-    try:
-        # Получаем всех пользователей
-        users = await get_all_users()
-        
-        # Путь к изображению
-        base_dir = Path(__file__).parent.parent.parent
-        image_path = base_dir / "images" / "islam_praktika_banner 1.jpg"
-        
-        # Проверяем существование изображения
-        photo = None
-        if image_path.exists():
-            photo = FSInputFile(image_path)
-        else:
-            logger.warning(f"Изображение не найдено: {image_path}")
-        
-        sent_count = 0
-        failed_count = 0
-        
-        for user in users:
-            try:
-                # Получаем имя пользователя
-                name = user.full_name or user.username or "друг"
-                
-                # Формируем текст сообщения
-                text = (
-                    f"<b>#{name}, завтра желательный пост! ✨</b>\n\n"
-                    "Ас-саляму алейкум!\n"
-                    "Напоминаем, что завтра — день добровольного поста, который любил соблюдать Пророк ﷺ. "
-                    "Это возможность получить великую награду.\n\n"
-                    "<strong>Да примет Аллах наш пост! 🤲 Амин</strong>"
-                )
-                
-                # Отправляем сообщение с фото или без
-                if photo:
-                    await bot.send_photo(
-                        chat_id=user.telegram_id,
-                        photo=photo,
-                        caption=text,
-                        parse_mode="HTML"
-                    )
-                else:
-                    await bot.send_message(
-                        chat_id=user.telegram_id,
-                        text=text,
-                        parse_mode="HTML"
-                    )
-                
-                sent_count += 1
-                await asyncio.sleep(0.05)  # Защита от лимитов API (20 сообщений в секунду)
-                
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"Ошибка отправки напоминания о посте пользователю {user.telegram_id}: {e}")
-                # Продолжаем отправку другим пользователям
-                continue
-        
-        logger.info(f"Рассылка о посте завершена. Отправлено: {sent_count}, Ошибок: {failed_count}")
-        
-    except Exception as e:
-        logger.error(f"Критическая ошибка при рассылке о посте: {e}", exc_info=True)
+    # Имя подставляется для каждого получателя вместо {name}
+    text = (
+        "<b>#{name}, завтра желательный пост! ✨</b>\n\n"
+        "Ас-саляму алейкум!\n"
+        "Напоминаем, что завтра — день добровольного поста, который любил соблюдать Пророк ﷺ. "
+        "Это возможность получить великую награду.\n\n"
+        "<strong>Да примет Аллах наш пост! 🤲 Амин</strong>"
+    )
+    
+    result = await broadcast_message(
+        bot,
+        text=text,
+        photo_path="images/islam_praktika_banner 1.jpg",
+        dedup_key=f"fasting:{local_today().isoformat()}",
+    )
+    logger.info(f"Рассылка о посте завершена. Отправлено: {result['sent']}, Ошибок: {result['failed']}")
 
 
 async def send_friday_reminder(bot: Bot):
     """Отправка напоминания о пятнице (пятница в 4:00 МСК)"""
-    try:
-        # Получаем всех пользователей
-        users = await get_all_users()
-        
-        # Путь к изображению
-        base_dir = Path(__file__).parent.parent.parent
-        image_path = base_dir / "images" / "islam_praktika_banner 2.jpg"
-        
-        # Проверяем существование изображения
-        photo = None
-        if image_path.exists():
-            photo = FSInputFile(image_path)
-        else:
-            logger.warning(f"Изображение не найдено: {image_path}")
-        
-        sent_count = 0
-        failed_count = 0
-        
-        for user in users:
-            try:
-                # Получаем имя пользователя
-                name = user.full_name or user.username or "друг"
-                
-                # Формируем текст сообщения
-                text = (
-                    f"<b>#{name}, сегодня пятница! ✨</b>\n\n"
-                    "Ас-саляму алейкум!\n"
-                    "Сегодня лучший день недели, наполненный благословением и возможностью получить огромную награду и прощение.\n\n"
-                    "<strong>🕌 Пятничная молитва в мечети — это обязанность каждого совершеннолетнего мужчины-мусульманина.\n\n"
-                    "💧 Крайне желательно сделать полное омовение (гусль).\n\n</strong>"
-                    "<strong>🤲 Желательные действия:</strong>\n"
-                    "- Прийти в мечеть как можно раньше\n"
-                    "- Надеть лучшую одежду и использовать благовония\n"
-                    "- Направиться в мечеть пешком\n"
-                    "- Прочесть суру «Аль-Кахф» (Пещера)\n"
-                    "- Усерднее читать салават Пророку ﷺ\n"
-                    "- Делать много дуа\n\n"
-                    "❗ Важно внимательно и молча слушать хутбу, не создавать неудобств в мечети и оставить мирские дела после призыва на намаз.\n\n"
-                    "<strong>Пусть Аллах примет наш намаз, простит грехи и ответит на наши мольбы в этот благословенный день! 🤲  Амин</strong>\n\n"
-                    "<blockquote>«Тому, кто должным образом совершит омовение, а потом явится на пятничную молитву и станет слушать, храня молчание, простятся его прегрешения, совершённые им между этой и (предыдущей) пятничной молитвой, а также в течение ещё трёх дней, что же касается перебирающего камешки, то он занимается пустым»\n"
-                    "(Муслим 857).\n\n"
-                    "«Клянусь, либо люди прекратят пропускать пятничные молитвы, либо Аллах запечатает сердца их, после чего они непременно окажутся в числе пренебрегающих»\n"
-                    "(Муслим 865).\n\n"
-                    "«Когда кто-нибудь совершает очищение в своём доме, а потом отправляется в один из домов Аллаха для совершения чего-либо из предписанного Аллахом, за один из сделанных им шагов с него снимается (бремя) его прегрешений, а за другой степень его возвышается.»\n"
-                    "(Муслим 666)\n\n"
-                    "«Полное омовение в пятницу обязательно для каждого достигшего (половой) зрелости»\n"
-                    "(Аль-Бухари 879)\n\n"
-                    "«О те, которые уверовали! Когда призывают на намаз в пятничный день, то устремляйтесь к поминанию Аллаха и оставьте торговлю. Так будет лучше для вас, если бы вы только знали»\n"
-                    "(Коран 62:9)</blockquote>"
-                )
-                
-                # Отправляем сообщение с фото или без
-                if photo:
-                    await bot.send_photo(
-                        chat_id=user.telegram_id,
-                        photo=photo,
-                        caption=text,
-                        parse_mode="HTML"
-                    )
-                else:
-                    await bot.send_message(
-                        chat_id=user.telegram_id,
-                        text=text,
-                        parse_mode="HTML"
-                    )
-                
-                sent_count += 1
-                await asyncio.sleep(0.05)  # Защита от лимитов API (20 сообщений в секунду)
-                
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"Ошибка отправки напоминания о пятнице пользователю {user.telegram_id}: {e}")
-                # Продолжаем отправку другим пользователям
-                continue
-        
-        logger.info(f"Рассылка о пятнице завершена. Отправлено: {sent_count}, Ошибок: {failed_count}")
-        
-    except Exception as e:
-        logger.error(f"Критическая ошибка при рассылке о пятнице: {e}", exc_info=True)
+    # Имя подставляется для каждого получателя вместо {name}
+    text = (
+        "<b>#{name}, сегодня пятница! ✨</b>\n\n"
+        "Ас-саляму алейкум!\n"
+        "Сегодня лучший день недели, наполненный благословением и возможностью получить огромную награду и прощение.\n\n"
+        "<strong>🕌 Пятничная молитва в мечети — это обязанность каждого совершеннолетнего мужчины-мусульманина.\n\n"
+        "💧 Крайне желательно сделать полное омовение (гусль).\n\n</strong>"
+        "<strong>🤲 Желательные действия:</strong>\n"
+        "- Прийти в мечеть как можно раньше\n"
+        "- Надеть лучшую одежду и использовать благовония\n"
+        "- Направиться в мечеть пешком\n"
+        "- Прочесть суру «Аль-Кахф» (Пещера)\n"
+        "- Усерднее читать салават Пророку ﷺ\n"
+        "- Делать много дуа\n\n"
+        "❗ Важно внимательно и молча слушать хутбу, не создавать неудобств в мечети и оставить мирские дела после призыва на намаз.\n\n"
+        "<strong>Пусть Аллах примет наш намаз, простит грехи и ответит на наши мольбы в этот благословенный день! 🤲  Амин</strong>\n\n"
+        "<blockquote>«Тому, кто должным образом совершит омовение, а потом явится на пятничную молитву и станет слушать, храня молчание, простятся его прегрешения, совершённые им между этой и (предыдущей) пятничной молитвой, а также в течение ещё трёх дней, что же касается перебирающего камешки, то он занимается пустым»\n"
+        "(Муслим 857).\n\n"
+        "«Клянусь, либо люди прекратят пропускать пятничные молитвы, либо Аллах запечатает сердца их, после чего они непременно окажутся в числе пренебрегающих»\n"
+        "(Муслим 865).\n\n"
+        "«Когда кто-нибудь совершает очищение в своём доме, а потом отправляется в один из домов Аллаха для совершения чего-либо из предписанного Аллахом, за один из сделанных им шагов с него снимается (бремя) его прегрешений, а за другой степень его возвышается.»\n"
+        "(Муслим 666)\n\n"
+        "«Полное омовение в пятницу обязательно для каждого достигшего (половой) зрелости»\n"
+        "(Аль-Бухари 879)\n\n"
+        "«О те, которые уверовали! Когда призывают на намаз в пятничный день, то устремляйтесь к поминанию Аллаха и оставьте торговлю. Так будет лучше для вас, если бы вы только знали»\n"
+        "(Коран 62:9)</blockquote>"
+    )
+    
+    result = await broadcast_message(
+        bot,
+        text=text,
+        photo_path="images/islam_praktika_banner 2.jpg",
+        dedup_key=f"friday:{local_today().isoformat()}",
+    )
+    logger.info(f"Рассылка о пятнице завершена. Отправлено: {result['sent']}, Ошибок: {result['failed']}")
+
+
+async def create_broadcast(
+    text: str,
+    photo_path: Optional[str] = None,
+    photo_file_id: Optional[str] = None,
+    parse_mode: str = "HTML",
+    dedup_key: Optional[str] = None,
+) -> BroadcastJob:
+    """Создать задание рассылки сообщения всем пользователям"""
+    # Приоритет: file_id > путь к файлу
+    payload = {
+        "text": text,
+        "parse_mode": parse_mode,
+        "photo_file_id": photo_file_id,
+        "photo_path": None if photo_file_id else photo_path,
+    }
+    return await create_broadcast_job(payload, dedup_key=dedup_key)
+
+
+async def create_copy_broadcast(from_chat_id: int, message_ids: List[int]) -> BroadcastJob:
+    """Создать задание рассылки копии сообщения (или альбома) администратора"""
+    payload = {
+        "mode": "copy",
+        "from_chat_id": from_chat_id,
+        "message_ids": sorted(message_ids),
+    }
+    return await create_broadcast_job(payload)
 
 
 async def broadcast_message(
@@ -289,81 +249,18 @@ async def broadcast_message(
     text: str,
     photo_path: Optional[str] = None,
     photo_file_id: Optional[str] = None,
-    parse_mode: str = "HTML"
+    parse_mode: str = "HTML",
+    dedup_key: Optional[str] = None,
 ) -> dict:
-    """Ручная рассылка сообщения всем пользователям"""
+    """
+    Рассылка сообщения всем пользователям
+
+    Рассылка сохраняется как задание в БД и после перезапуска бота
+    продолжается с места остановки (см. broadcast_job_service).
+    """
     try:
-        users = await get_all_users()
-        
-        # Приоритет: file_id > путь к файлу
-        use_file_id = photo_file_id is not None
-        
-        if not use_file_id and photo_path:
-            photo_file = Path(photo_path)
-            # Преобразуем в абсолютный путь
-            if not photo_file.is_absolute():
-                base_dir = Path(__file__).parent.parent.parent
-                photo_file = base_dir / photo_path
-            
-            logger.info(f"Проверка фото: {photo_file}, существует: {photo_file.exists()}")
-            
-            if photo_file.exists():
-                photo_input = FSInputFile(photo_file)
-                logger.info(f"Фото загружено из файла: {photo_file}")
-            else:
-                logger.warning(f"Изображение не найдено: {photo_file} (абсолютный путь)")
-                logger.warning(f"Оригинальный путь: {photo_path}")
-                photo_input = None
-        else:
-            photo_input = None
-        
-        sent_count = 0
-        failed_count = 0
-        
-        for user in users:
-            try:
-                # Подставляем имя пользователя в текст (если есть {name})
-                user_name = user.full_name or user.username or "друг"
-                personalized_text = text.replace("{name}", user_name).replace("#{name}", f"#{user_name}")
-                
-                if use_file_id:
-                    # Используем file_id напрямую (проще и надежнее)
-                    await bot.send_photo(
-                        chat_id=user.telegram_id,
-                        photo=photo_file_id,
-                        caption=personalized_text,
-                        parse_mode=parse_mode
-                    )
-                elif photo_input:
-                    # Используем файл с диска
-                    await bot.send_photo(
-                        chat_id=user.telegram_id,
-                        photo=photo_input,
-                        caption=personalized_text,
-                        parse_mode=parse_mode
-                    )
-                else:
-                    # Только текст
-                    await bot.send_message(
-                        chat_id=user.telegram_id,
-                        text=personalized_text,
-                        parse_mode=parse_mode
-                    )
-                
-                sent_count += 1
-                await asyncio.sleep(0.05)
-                
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"Ошибка отправки сообщения пользователю {user.telegram_id}: {e}", exc_info=True)
-                continue
-        
-        return {
-            "success": True,
-            "sent": sent_count,
-            "failed": failed_count,
-            "total": len(users)
-        }
+        job = await create_broadcast(text, photo_path, photo_file_id, parse_mode, dedup_key)
+        return await start_broadcast_job(bot, job.id)
         
     except Exception as e:
         logger.error(f"Критическая ошибка при рассылке: {e}", exc_info=True)
@@ -376,60 +273,55 @@ async def broadcast_message(
         }
 
 
-def get_msk_time() -> datetime:
-    """Получить текущее время в МСК (UTC+3)"""
-    utc_now = datetime.utcnow()
-    msk_time = utc_now + timedelta(hours=3)
-    return msk_time
-
-
 async def notification_worker(bot: Bot):
-    """Рабочий поток для уведомлений"""
-    last_fasting_sunday = None
-    last_fasting_wednesday = None
-    last_friday = None
+    """
+    Планировщик уведомлений
+
+    Утреннее напоминание уходит всем в одно время из конфига (UTC).
+    Вечерние напоминания проверяются каждую минуту: каждый пользователь
+    получает свое в выбранное время в своем часовом поясе. Напоминания
+    о посте и пятнице привязаны к московскому времени.
+    """
+    scheduler = Scheduler(bot)
+    
+    # Утреннее напоминание (09:00 МСК = 06:00 UTC)
+    scheduler.add_job(
+        "morning_reminder",
+        Schedule.daily(config.MORNING_REMINDER, tz="UTC"),
+        send_daily_reminders,
+        grace=timedelta(hours=2),
+    )
+    
+    # Вечерние напоминания по времени пользователей (next_reminder_at)
+    scheduler.add_job(
+        "evening_reminder",
+        Schedule(minute=None),
+        send_evening_reminders,
+        grace=timedelta(minutes=5),
+    )
+    
+    # Напоминание о посте: воскресенье и среда в 18:00 МСК
+    scheduler.add_job(
+        "fasting_reminder",
+        Schedule(minute=0, hour=18, weekdays=[2, 6]),
+        send_fasting_reminder,
+        grace=timedelta(hours=4),
+    )
+    
+    # Напоминание о пятнице: пятница в 4:00 МСК
+    scheduler.add_job(
+        "friday_reminder",
+        Schedule(minute=0, hour=4, weekdays=[4]),
+        send_friday_reminder,
+        grace=timedelta(hours=6),
+    )
+    
+    # Свертка журнала очков в users.points
+    scheduler.add_job(
+        "points_rollup",
+        Schedule(minute=None),
+        lambda bot: rollup_points(),
+        grace=timedelta(minutes=5),
+    )
     
-    while True:
-        try:
-            # Получаем текущее время в МСК
-            msk_now = get_msk_time()
-            current_time = msk_now.time()
-            current_weekday = msk_now.weekday()  # 0=понедельник, 4=пятница, 6=воскресенье
-            
-            # Утреннее напоминание (09:00 МСК = 06:00 UTC)
-            if current_time.hour == 9 and current_time.minute == 0:
-                await send_daily_reminders(bot)
-                await asyncio.sleep(60)
-            
-            # Вечернее напоминание (20:00 МСК = 17:00 UTC)
-            if current_time.hour == 20 and current_time.minute == 0:
-                await send_evening_reminders(bot)
-                await asyncio.sleep(60)
-            
-            # Напоминание о посте: воскресенье в 18:00 МСК (15:00 UTC)
-            if current_weekday == 6 and current_time.hour == 18 and current_time.minute == 0:
-                if last_fasting_sunday != msk_now.date():
-                    await send_fasting_reminder(bot)
-                    last_fasting_sunday = msk_now.date()
-                    await asyncio.sleep(60)
-            
-            # Напоминание о посте: среда в 18:00 МСК (15:00 UTC)
-            if current_weekday == 2 and current_time.hour == 18 and current_time.minute == 0:
-                if last_fasting_wednesday != msk_now.date():
-                    await send_fasting_reminder(bot)
-                    last_fasting_wednesday = msk_now.date()
-                    await asyncio.sleep(60)
-            
-            # Напоминание о пятнице: пятница в 4:00 МСК (1:00 UTC)
-            if current_weekday == 4 and current_time.hour == 4 and current_time.minute == 0:
-                if last_friday != msk_now.date():
-                    await send_friday_reminder(bot)
-                    last_friday = msk_now.date()
-                    await asyncio.sleep(60)
-            
-            # Проверяем каждую минуту
-            await asyncio.sleep(60)
-            
-        except Exception as e:
-            logger.error(f"Ошибка в notification_worker: {e}", exc_info=True)
-            await asyncio.sleep(60)
\ No newline at end of file
+    await scheduler.run()
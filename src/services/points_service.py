@@ -0,0 +1,137 @@
+"""Сервис начисления очков"""
+import logging
+from typing import Optional
+
+from sqlalchemy import select, update, insert, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import config
+from src.database.models import PointsLedger, PointsRollupCursor, User
+from src.utils.db import get_session
+
+logger = logging.getLogger(__name__)
+
+# Единственная строка points_rollup_cursor
+ROLLUP_CURSOR_ID = 1
+
+
+async def add_points(
+    session: AsyncSession,
+    user_id: int,
+    points: int,
+    source: str,
+    ref_id: Optional[int] = None,
+):
+    """
+    Начислить очки пользователю
+
+    Только INSERT в журнал: строка users не блокируется, поэтому
+    одновременные действия пользователя не ждут друг друга.
+    В users.points начисление попадет при следующей свертке.
+    """
+    await session.execute(
+        insert(PointsLedger).values(user_id=user_id, delta=points, source=source, ref_id=ref_id)
+    )
+
+
+def _rolled_up_id():
+    """Граница свертки: записи журнала с id не больше нее уже в users.points"""
+    return func.coalesce(
+        select(PointsRollupCursor.last_id)
+        .where(PointsRollupCursor.id == ROLLUP_CURSOR_ID)
+        .scalar_subquery(),
+        0,
+    )
+
+
+async def get_points_balance(session: AsyncSession, user_id: int) -> int:
+    """Точный баланс: свернутые очки плюс записи журнала после границы свертки"""
+    pending = (
+        select(func.coalesce(func.sum(PointsLedger.delta), 0))
+        .where(PointsLedger.user_id == user_id, PointsLedger.id > _rolled_up_id())
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        select(User.points + pending).where(User.id == user_id)
+    )
+    return result.scalar_one_or_none() or 0
+
+
+async def _ledger_horizon() -> int:
+    """
+    Последний id журнала, раньше которого новых записей уже не появится
+
+    Id выдаются при INSERT, а фиксируются транзакции в другом порядке,
+    поэтому граница свертки не может просто перескочить на max(id):
+    запись еще не завершенной транзакции с меньшим id была бы потеряна.
+    SHARE-блокировка журнала дожидается транзакций, которые в него пишут
+    (INSERT держит ROW EXCLUSIVE до конца транзакции), и держится только
+    до конца этой короткой транзакции. Если ждать дольше
+    POINTS_ROLLUP_LOCK_TIMEOUT, свертка завершается ошибкой и будет
+    повторена при следующем запуске.
+    """
+    async with get_session() as session:
+        await session.execute(
+            select(func.set_config("lock_timeout", f"{config.POINTS_ROLLUP_LOCK_TIMEOUT}ms", True))
+        )
+        await session.execute(text("LOCK TABLE points_ledger IN SHARE MODE"))
+        return await session.scalar(select(func.coalesce(func.max(PointsLedger.id), 0)))
+
+
+async def rollup_points(batch_size: Optional[int] = None) -> int:
+    """
+    Свернуть журнал очков в users.points
+
+    Записи журнала не изменяются: за одну транзакцию суммы следующего
+    диапазона id прибавляются к users.points и граница свертки
+    (points_rollup_cursor.last_id) сдвигается на конец диапазона,
+    поэтому баланс (get_points_balance) остается точным в любой момент.
+    Возвращает число свернутых записей.
+    """
+    batch_size = batch_size or config.POINTS_ROLLUP_BATCH
+    horizon = await _ledger_horizon()
+
+    async with get_session() as session:
+        await session.execute(
+            pg_insert(PointsRollupCursor).values(id=ROLLUP_CURSOR_ID).on_conflict_do_nothing()
+        )
+
+    total = 0
+
+    while True:
+        async with get_session() as session:
+            # Блокировка строки курсора не дает двум процессам свернуть диапазон дважды
+            last_id = await session.scalar(
+                select(PointsRollupCursor.last_id)
+                .where(PointsRollupCursor.id == ROLLUP_CURSOR_ID)
+                .with_for_update()
+            )
+            if last_id >= horizon:
+                break
+            upper = min(last_id + batch_size, horizon)
+
+            sums = (
+                select(PointsLedger.user_id, func.sum(PointsLedger.delta).label("delta"), func.count().label("entries"))
+                .where(PointsLedger.id > last_id, PointsLedger.id <= upper)
+                .group_by(PointsLedger.user_id)
+                .cte("sums")
+            )
+            applied = (
+                update(User)
+                .where(User.id == sums.c.user_id)
+                .values(points=User.points + sums.c.delta)
+                .returning(sums.c.entries)
+                .cte("applied")
+            )
+            count = await session.scalar(select(func.coalesce(func.sum(applied.c.entries), 0)))
+            await session.execute(
+                update(PointsRollupCursor)
+                .where(PointsRollupCursor.id == ROLLUP_CURSOR_ID)
+                .values(last_id=upper)
+            )
+        total += count
+
+    if total:
+        logger.info(f"Свернуто записей журнала очков: {total}")
+    return total
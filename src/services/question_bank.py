@@ -0,0 +1,92 @@
+"""Банк вопросов Большого Теста в памяти процесса"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import config
+from src.database.models import QuizQuestion
+
+
+@dataclass(frozen=True)
+class BankQuestion:
+    """Вопрос теста (неизменяемая копия строки quiz_questions)"""
+    id: int
+    question_text: str
+    options: Tuple[str, ...]
+    correct_answer: int
+    category: str
+    difficulty: int
+    explanation: Optional[str]
+
+
+class QuestionBank:
+    """Активные вопросы, сгруппированные по id и по категориям"""
+    def __init__(self, questions: List[BankQuestion]):
+        self.questions = questions
+        self.by_id: Dict[int, BankQuestion] = {question.id: question for question in questions}
+        self.by_category: Dict[str, List[BankQuestion]] = {}
+        for question in questions:
+            self.by_category.setdefault(question.category, []).append(question)
+        self.loaded_at = time.monotonic()
+
+    @property
+    def categories(self) -> List[str]:
+        return sorted(self.by_category)
+
+    def get(self, question_id: int) -> Optional[BankQuestion]:
+        return self.by_id.get(question_id)
+
+    def random(self, category: Optional[str] = None) -> Optional[BankQuestion]:
+        """Случайный вопрос (из категории, если она указана)"""
+        questions = self.by_category.get(category, []) if category else self.questions
+        return random.choice(questions) if questions else None
+
+
+_bank: Optional[QuestionBank] = None
+_lock = asyncio.Lock()
+
+
+async def load_question_bank(session: AsyncSession) -> QuestionBank:
+    """Прочитать активные вопросы из БД"""
+    result = await session.execute(
+        select(QuizQuestion).where(QuizQuestion.is_active == True).order_by(QuizQuestion.id)
+    )
+    return QuestionBank([
+        BankQuestion(
+            id=question.id,
+            question_text=question.question_text,
+            options=tuple(question.options),
+            correct_answer=question.correct_answer,
+            category=question.category,
+            difficulty=question.difficulty or 1,
+            explanation=question.explanation,
+        )
+        for question in result.scalars()
+    ])
+
+
+async def get_question_bank(session: AsyncSession) -> QuestionBank:
+    """
+    Банк вопросов процесса
+
+    Перечитывается из БД не чаще раза в QUESTION_BANK_TTL секунд, поэтому
+    новые и отключенные вопросы появляются в тесте с этой задержкой.
+    """
+    global _bank
+    if _bank is not None and time.monotonic() - _bank.loaded_at < config.QUESTION_BANK_TTL:
+        return _bank
+    async with _lock:
+        if _bank is None or time.monotonic() - _bank.loaded_at >= config.QUESTION_BANK_TTL:
+            _bank = await load_question_bank(session)
+    return _bank
+
+
+def reset_question_bank():
+    """Сбросить банк (например, после изменения вопросов)"""
+    global _bank
+    _bank = None
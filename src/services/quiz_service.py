@@ -1,40 +1,28 @@
 """Сервис для работы с тестами"""
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
-from typing import List, Optional, Tuple
+from sqlalchemy import select, and_, func, cast, literal, Integer, BigInteger
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from typing import List, Optional
 from datetime import datetime
-import random
 
-from src.database.models import QuizQuestion, UserQuizProgress, User
-from src.services.user_service import add_points
+from src.database.models import PointsLedger, UserQuizProgress
+from src.services.question_bank import BankQuestion, get_question_bank
 from src.config import config
 
 
 async def get_random_question(
     session: AsyncSession,
     category: Optional[str] = None,
-) -> Optional[QuizQuestion]:
-    """Получить случайный вопрос"""
-    query = select(QuizQuestion).where(QuizQuestion.is_active == True)
-    
-    if category:
-        query = query.where(QuizQuestion.category == category)
-    
-    result = await session.execute(query)
-    questions = list(result.scalars().all())
-    
-    if not questions:
-        return None
-    
-    return random.choice(questions)
+) -> Optional[BankQuestion]:
+    """Получить случайный вопрос (из банка в памяти, без запроса к БД)"""
+    bank = await get_question_bank(session)
+    return bank.random(category)
 
 
-async def get_question(session: AsyncSession, question_id: int) -> Optional[QuizQuestion]:
+async def get_question(session: AsyncSession, question_id: int) -> Optional[BankQuestion]:
     """Получить вопрос по ID"""
-    result = await session.execute(
-        select(QuizQuestion).where(QuizQuestion.id == question_id)
-    )
-    return result.scalar_one_or_none()
+    bank = await get_question_bank(session)
+    return bank.get(question_id)
 
 
 async def get_user_quiz_progress(
@@ -59,19 +47,16 @@ async def create_or_get_quiz_progress(
     user_id: int,
     quiz_mode: str,
 ) -> UserQuizProgress:
-    """Создать или получить прогресс пользователя по тесту"""
-    progress = await get_user_quiz_progress(session, user_id, quiz_mode)
-    
-    if not progress:
-        progress = UserQuizProgress(
-            user_id=user_id,
-            quiz_mode=quiz_mode,
-        )
-        session.add(progress)
-        await session.commit()
-        await session.refresh(progress)
-    
-    return progress
+    """Создать или получить прогресс пользователя по тесту (один INSERT ... ON CONFLICT)"""
+    stmt = insert(UserQuizProgress).values(user_id=user_id, quiz_mode=quiz_mode)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_user_quiz_mode",
+        set_={"quiz_mode": stmt.excluded.quiz_mode},  # без изменений, чтобы RETURNING вернул строку
+    )
+    result = await session.scalars(
+        stmt.returning(UserQuizProgress), execution_options={"populate_existing": True}
+    )
+    return result.one()
 
 
 class QuizAnswerResult:
@@ -89,6 +74,35 @@ class QuizAnswerResult:
         self.multiplier = multiplier
 
 
+def _streak_multiplier(streak: int) -> float:
+    """Множитель очков за серию правильных ответов"""
+    return min(1.0 + (streak * 0.1), config.MAX_STREAK_MULTIPLIER)
+
+
+def _answer_points(difficulty: int, streak):
+    """SQL-выражение очков за правильный ответ при серии streak до ответа"""
+    multiplier = func.least(1.0 + streak * 0.1, config.MAX_STREAK_MULTIPLIER)
+    return cast(func.floor(10 * difficulty * multiplier), Integer)
+
+
+def _count_category(category: str, is_correct: bool):
+    """SQL-выражение: category_stats с ответом в категории (jsonb ||, без чтения документа)"""
+    stats = func.coalesce(UserQuizProgress.category_stats, literal({}, JSONB))
+    
+    def counter(key: str):
+        return func.coalesce(stats[(category, key)].astext.cast(Integer), 0)
+    
+    return stats.op("||", return_type=JSONB)(
+        func.jsonb_build_object(
+            category,
+            func.jsonb_build_object(
+                "total", counter("total") + 1,
+                "correct", counter("correct") + int(is_correct),
+            ),
+        )
+    )
+
+
 async def answer_question(
     session: AsyncSession,
     user_id: int,
@@ -96,65 +110,89 @@ async def answer_question(
     answer_index: int,
     quiz_mode: str = "infinite",
 ) -> QuizAnswerResult:
-    """Ответить на вопрос"""
+    """
+    Ответить на вопрос
+    
+    Вопрос берется из банка в памяти, а прогресс, счетчики категорий
+    и запись в журнал очков меняются одним запросом: на ответ приходится
+    один запрос и COMMIT.
+    """
     question = await get_question(session, question_id)
     
     if not question:
         return QuizAnswerResult(False)
     
-    # Получаем или создаем прогресс
-    progress = await create_or_get_quiz_progress(session, user_id, quiz_mode)
-    
     is_correct = answer_index == question.correct_answer
     
-    # Вычисляем множитель на основе серии
-    multiplier = min(1.0 + (progress.current_streak * 0.1), config.MAX_STREAK_MULTIPLIER)
-    
+    # Прогресс создается или обновляется одним INSERT ... ON CONFLICT.
+    # Счетчики меняются от значений в строке, а не в памяти: одновременные
+    # ответы не теряют друг друга. Множитель считается от серии до ответа,
+    # поэтому в RETURNING он восстанавливается как current_streak - 1
+    now = datetime.now()
+    first_answer = {
+        "user_id": user_id,
+        "quiz_mode": quiz_mode,
+        "total_answered": 1,
+        "last_played": now,
+        "current_streak": int(is_correct),
+        "longest_streak": int(is_correct),
+        "total_correct": int(is_correct),
+        "score": _answer_points(question.difficulty, literal(0)) if is_correct else 0,
+        "category_stats": {question.category: {"total": 1, "correct": int(is_correct)}},
+    }
+    changes = {
+        "total_answered": UserQuizProgress.total_answered + 1,
+        "last_played": now,
+        "category_stats": _count_category(question.category, is_correct),
+    }
     if is_correct:
-        points = int(10 * question.difficulty * multiplier)
-        progress.current_streak += 1
-        progress.total_correct += 1
-        
-        if progress.current_streak > progress.longest_streak:
-            progress.longest_streak = progress.current_streak
+        changes.update(
+            current_streak=UserQuizProgress.current_streak + 1,
+            longest_streak=func.greatest(UserQuizProgress.longest_streak, UserQuizProgress.current_streak + 1),
+            total_correct=UserQuizProgress.total_correct + 1,
+            score=UserQuizProgress.score + _answer_points(question.difficulty, UserQuizProgress.current_streak),
+        )
+        returned_points = _answer_points(question.difficulty, UserQuizProgress.current_streak - 1)
     else:
-        points = 0
-        progress.current_streak = 0
+        changes["current_streak"] = 0
+        returned_points = literal(0)
+    
+    upsert = insert(UserQuizProgress).values(**first_answer)
+    upsert = upsert.on_conflict_do_update(constraint="uq_user_quiz_mode", set_=changes)
+    progress = upsert.returning(
+        UserQuizProgress.current_streak,
+        returned_points.label("points"),
+    ).cte("progress")
+    
+    # Очки пишутся в журнал в том же запросе (data-modifying CTE),
+    # только если ответ что-то принес
+    ledger = insert(PointsLedger).from_select(
+        ["user_id", "delta", "source", "ref_id"],
+        select(
+            literal(user_id, BigInteger),
+            progress.c.points,
+            literal("quiz"),
+            literal(question_id, BigInteger),
+        ).where(progress.c.points > 0),
+    ).cte("ledger")
     
-    progress.total_answered += 1
-    progress.score += points
-    progress.last_played = datetime.now()
-    
-    # Обновляем статистику по категориям
-    if question.category not in progress.category_stats:
-        progress.category_stats[question.category] = {"total": 0, "correct": 0}
-    
-    progress.category_stats[question.category]["total"] += 1
-    if is_correct:
-        progress.category_stats[question.category]["correct"] += 1
-    
-    # Начисляем очки пользователю
-    if points > 0:
-        user_result = await session.execute(select(User).where(User.id == user_id))
-        user = user_result.scalar_one()
-        await add_points(session, user, points)
+    result = await session.execute(
+        select(progress.c.current_streak, progress.c.points).add_cte(ledger)
+    )
+    current_streak, points = result.one()
+    multiplier = _streak_multiplier(current_streak - 1) if is_correct else 1.0
     
     await session.commit()
-    await session.refresh(progress)
     
     return QuizAnswerResult(
         correct=is_correct,
         points=points,
-        current_streak=progress.current_streak,
+        current_streak=current_streak,
         multiplier=multiplier,
     )
 
 
 async def get_categories(session: AsyncSession) -> List[str]:
     """Получить список категорий вопросов"""
-    result = await session.execute(
-        select(QuizQuestion.category)
-        .where(QuizQuestion.is_active == True)
-        .distinct()
-    )
-    return [row[0] for row in result.all()]
\ No newline at end of file
+    bank = await get_question_bank(session)
+    return bank.categories
@@ -0,0 +1,196 @@
+"""Планировщик периодических задач"""
+import asyncio
+import logging
+from datetime import datetime, date, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from src.config import config
+from src.database.models import SchedulerRun
+from src.utils.db import get_session
+
+logger = logging.getLogger(__name__)
+
+
+def local_now(tz: Optional[str] = None) -> datetime:
+    """Текущее время в часовом поясе расписаний"""
+    return datetime.now(ZoneInfo(tz or config.TIMEZONE))
+
+
+def local_today(tz: Optional[str] = None) -> date:
+    """Текущая дата в часовом поясе расписаний"""
+    return local_now(tz).date()
+
+
+def _as_set(value, full_range: range) -> List[int]:
+    """Значение поля расписания -> отсортированный список (None = любое)"""
+    if value is None:
+        return list(full_range)
+    if isinstance(value, int):
+        return [value]
+    return sorted(set(value))
+
+
+class Schedule:
+    """Расписание в стиле cron: минуты, часы и дни недели в заданном часовом поясе"""
+    def __init__(
+        self,
+        minute=0,
+        hour=None,
+        weekdays: Optional[Iterable[int]] = None,  # 0=понедельник, 6=воскресенье
+        tz: Optional[str] = None,
+    ):
+        self.minutes = _as_set(minute, range(60))
+        self.hours = _as_set(hour, range(24))
+        self.weekdays: Set[int] = set(_as_set(weekdays, range(7)))
+        self.tz = ZoneInfo(tz or config.TIMEZONE)
+
+    @classmethod
+    def daily(cls, at: str, tz: Optional[str] = None) -> "Schedule":
+        """Ежедневно в указанное время ('HH:MM')"""
+        hour, minute = (int(part) for part in at.split(":"))
+        return cls(minute=minute, hour=hour, tz=tz)
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Ближайшее время запуска строго после moment (aware datetime)"""
+        local = moment.astimezone(self.tz)
+        day = local.date()
+        # Расписание с днями недели повторяется не реже раза в неделю
+        for _ in range(8):
+            if day.weekday() in self.weekdays:
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = datetime(day.year, day.month, day.day, hour, minute, tzinfo=self.tz)
+                        if candidate > local:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError("Расписание не содержит ни одного времени запуска")
+
+
+class ScheduledJob:
+    """Задача планировщика"""
+    def __init__(
+        self,
+        name: str,
+        schedule: Schedule,
+        func: Callable[..., Awaitable],
+        grace: timedelta,
+    ):
+        self.name = name
+        self.schedule = schedule
+        self.func = func
+        self.grace = grace
+        self.next_run: Optional[datetime] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+async def _load_last_runs() -> Dict[str, datetime]:
+    """Последние запуски задач из БД (aware UTC)"""
+    async with get_session() as session:
+        result = await session.execute(select(SchedulerRun))
+        return {
+            run.job_name: run.last_run_at.replace(tzinfo=timezone.utc)
+            for run in result.scalars().all()
+        }
+
+
+async def _save_last_run(job_name: str, run_at: datetime):
+    """Запомнить плановое время запуска задачи"""
+    run_at = run_at.astimezone(timezone.utc).replace(tzinfo=None)
+    async with get_session() as session:
+        stmt = insert(SchedulerRun).values(job_name=job_name, last_run_at=run_at)
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[SchedulerRun.job_name],
+                set_={"last_run_at": stmt.excluded.last_run_at},
+            )
+        )
+
+
+class Scheduler:
+    """
+    Планировщик: спит ровно до ближайшего запуска
+
+    Время последнего запуска каждой задачи хранится в БД. Запуски,
+    пропущенные из-за перезапуска бота, выполняются при старте, если
+    с планового времени прошло не больше окна grace. Каждая задача
+    выполняется в отдельной asyncio-задаче, поэтому долгая рассылка
+    не задерживает следующие запуски.
+    """
+    def __init__(self, *args):
+        self.args = args  # аргументы, с которыми вызываются задачи (например, bot)
+        self.jobs: List[ScheduledJob] = []
+
+    def add_job(
+        self,
+        name: str,
+        schedule: Schedule,
+        func: Callable[..., Awaitable],
+        grace: timedelta = timedelta(hours=1),
+    ):
+        """Добавить задачу"""
+        self.jobs.append(ScheduledJob(name, schedule, func, grace))
+
+    def _launch(self, job: ScheduledJob, fire_time: datetime):
+        """Запустить задачу в фоне"""
+        if job.task and not job.task.done():
+            logger.warning(f"Задача {job.name} еще выполняется, запуск на {fire_time} пропущен")
+            return
+        job.task = asyncio.create_task(self._run_job(job, fire_time))
+
+    async def _run_job(self, job: ScheduledJob, fire_time: datetime):
+        """
+        Выполнить задачу и записать время запуска
+
+        Время сохраняется только после успешного выполнения: запуск, который
+        упал или был прерван перезапуском бота, повторится при старте.
+        """
+        try:
+            logger.info(f"Запуск задачи {job.name} (план: {fire_time})")
+            await job.func(*self.args)
+            await _save_last_run(job.name, fire_time)
+        except Exception as e:
+            logger.error(f"Ошибка в задаче {job.name}: {e}", exc_info=True)
+
+    async def _catch_up(self, now: datetime):
+        """Выполнить запуски, пропущенные пока бот не работал"""
+        last_runs = await _load_last_runs()
+        for job in self.jobs:
+            last_run = last_runs.get(job.name)
+            if last_run is None:
+                continue
+
+            missed = job.schedule.next_after(last_run)
+            latest_missed = None
+            while missed <= now:
+                latest_missed = missed
+                missed = job.schedule.next_after(missed)
+
+            if latest_missed and now - latest_missed <= job.grace:
+                logger.info(f"Догоняем пропущенный запуск {job.name} ({latest_missed})")
+                self._launch(job, latest_missed)
+
+    async def run(self):
+        """Основной цикл планировщика"""
+        now = datetime.now(timezone.utc)
+        try:
+            await self._catch_up(now)
+        except Exception as e:
+            logger.error(f"Ошибка при проверке пропущенных запусков: {e}", exc_info=True)
+
+        for job in self.jobs:
+            job.next_run = job.schedule.next_after(now)
+
+        while True:
+            job = min(self.jobs, key=lambda j: j.next_run)
+            delay = (job.next_run - datetime.now(timezone.utc)).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            fire_time = job.next_run
+            job.next_run = job.schedule.next_after(fire_time)
+            self._launch(job, fire_time)
@@ -1,13 +1,15 @@
 """Сервис для работы с навыками"""
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, update, and_, or_, case
+from sqlalchemy.dialects.postgresql import insert
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 
-from src.database.models import Skill, UserSkill, DailyFocus, User
-from src.services.user_service import add_points
+from src.database.models import Skill, UserSkill, DailyFocus
+from src.services.points_service import add_points
 from src.services.course_service import unlock_next_lesson
 from src.config import config
+from src.utils.day_bitmap import current_streak, sql_set_day, sql_start_date
 
 
 async def get_user_skill(
@@ -32,34 +34,47 @@ async def create_user_skill(
     user_id: int,
     skill_id: int,
 ) -> UserSkill:
-    """Создать прогресс пользователя по навыку"""
+    """Создать прогресс пользователя по навыку (или вернуть уже созданный)"""
     skill_result = await session.execute(select(Skill).where(Skill.id == skill_id))
     skill = skill_result.scalar_one()
     
-    user_skill = UserSkill(
+    end_date = None
+    if skill.repetition_type == "sequential" and skill.duration_days:
+        end_date = date.today() + timedelta(days=skill.duration_days)
+    
+    stmt = insert(UserSkill).values(
         user_id=user_id,
         skill_id=skill_id,
         target_streak=skill.target_streak,
         status="active",
         start_date=date.today(),
+        end_date=end_date,
     )
-    
-    if skill.repetition_type == "sequential" and skill.duration_days:
-        user_skill.end_date = date.today() + timedelta(days=skill.duration_days)
-    
-    session.add(user_skill)
-    await session.commit()
-    await session.refresh(user_skill)
-    return user_skill
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_user_skill",
+        set_={"skill_id": stmt.excluded.skill_id},  # без изменений, чтобы RETURNING вернул строку
+    )
+    result = await session.scalars(
+        stmt.returning(UserSkill), execution_options={"populate_existing": True}
+    )
+    return result.one()
 
 
 class SkillCompletionResult:
     """Результат выполнения навыка"""
-    def __init__(self, success: bool, points: int = 0, message: str = "", completed: bool = False):
+    def __init__(
+        self,
+        success: bool,
+        points: int = 0,
+        message: str = "",
+        completed: bool = False,
+        days_in_row: int = 0,
+    ):
         self.success = success
         self.points = points
         self.message = message
         self.completed = completed
+        self.days_in_row = days_in_row  # дней подряд по completed_days
 
 
 async def complete_skill(
@@ -107,32 +122,47 @@ async def complete_skill(
     if in_focus:
         points = int(points * config.POINTS_MULTIPLIER_FOCUS)
     
-    # Обновляем прогресс
-    user_skill.current_streak += 1
-    user_skill.last_completed_at = datetime.now()
-    
-    if date.today().isoformat() not in user_skill.completed_dates:
-        user_skill.completed_dates.append(date.today().isoformat())
-    
-    # Проверяем завершение
-    completed = False
-    if user_skill.current_streak >= user_skill.target_streak:
-        user_skill.status = "completed"
-        completed = True
+    # Обновляем прогресс одним UPDATE: условие повторяет проверки выше,
+    # поэтому двойное нажатие засчитывается только один раз
+    now = datetime.now()
+    today = date.today()
+    new_streak = UserSkill.current_streak + 1
+    result = await session.execute(
+        update(UserSkill)
+        .where(
+            UserSkill.id == user_skill.id,
+            UserSkill.status != "completed",
+            or_(
+                UserSkill.last_completed_at.is_(None),
+                UserSkill.last_completed_at <= now - timedelta(hours=skill.cooldown_hours),
+            ),
+        )
+        .values(
+            current_streak=new_streak,
+            last_completed_at=now,
+            completed_days=sql_set_day(UserSkill.completed_days, UserSkill.start_date, today),
+            start_date=sql_start_date(UserSkill.start_date, today),
+            status=case((new_streak >= UserSkill.target_streak, "completed"), else_=UserSkill.status),
+        )
+        .returning(UserSkill.status, UserSkill.completed_days, UserSkill.start_date)
+        .execution_options(synchronize_session="fetch")
+    )
+    row = result.one_or_none()
+    if row is None:
+        return SkillCompletionResult(False, message="Вы уже выполняли это задание сегодня")
+    completed = row.status == "completed"
+    days_in_row = current_streak(row.completed_days, row.start_date, today)
     
     # Начисляем очки пользователю
-    user_result = await session.execute(select(User).where(User.id == user_id))
-    user = user_result.scalar_one()
-    await add_points(session, user, points)
+    await add_points(session, user_id, points, source="skill", ref_id=skill_id)
     
     await session.commit()
-    await session.refresh(user_skill)
     
     # Если навык привязан к курсу, проверяем открытие следующего урока
     if skill.course_id:
         await unlock_next_lesson(session, user_id, skill.course_id)
     
-    return SkillCompletionResult(True, points=points, completed=completed)
+    return SkillCompletionResult(True, points=points, completed=completed, days_in_row=days_in_row)
 
 
 async def get_daily_focus(
@@ -174,17 +204,21 @@ async def set_daily_focus(
     else:
         focus.skill_ids = skill_ids
     
-    # Обновляем in_focus_today для всех навыков пользователя
-    all_user_skills_result = await session.execute(
-        select(UserSkill).where(UserSkill.user_id == user_id)
+    # Обновляем in_focus_today и отмечаем день в фокусе для всех навыков пользователя
+    in_focus = UserSkill.skill_id.in_(skill_ids)
+    await session.execute(
+        update(UserSkill)
+        .where(UserSkill.user_id == user_id)
+        .values(
+            in_focus_today=in_focus,
+            focus_days=case(
+                (in_focus, sql_set_day(UserSkill.focus_days, UserSkill.start_date, today)),
+                else_=UserSkill.focus_days,
+            ),
+            start_date=sql_start_date(UserSkill.start_date, today),
+        )
+        .execution_options(synchronize_session="fetch")
     )
-    all_user_skills = all_user_skills_result.scalars().all()
-    
-    for user_skill in all_user_skills:
-        user_skill.in_focus_today = user_skill.skill_id in skill_ids
-        if user_skill.skill_id in skill_ids:
-            if today.isoformat() not in user_skill.focus_dates:
-                user_skill.focus_dates.append(today.isoformat())
     
     await session.commit()
     await session.refresh(focus)
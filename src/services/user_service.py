@@ -1,12 +1,16 @@
 """Сервис для работы с пользователями"""
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, case, cast, func, Date, Row
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
-from typing import Optional
-from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
 
 from src.database.models import User
 from src.config import config
+from src.services.identity_cache import identity_cache, identity_of
+from src.utils.db import get_session
 
 
 async def get_or_create_user(
@@ -16,26 +20,73 @@ async def get_or_create_user(
     full_name: Optional[str] = None,
     language_code: str = "ru",
 ) -> User:
-    """Получить или создать пользователя"""
-    result = await session.execute(
-        select(User).where(User.telegram_id == telegram_id)
+    """
+    Получить или создать пользователя
+
+    Один INSERT ... ON CONFLICT: новый пользователь создается, у существующего
+    обновляются username и имя, а недоступный снова включается в рассылки.
+    """
+    reminder_time = time.fromisoformat(config.DAILY_REMINDER)
+    stmt = insert(User).values(
+        telegram_id=telegram_id,
+        username=username,
+        full_name=full_name,
+        language_code=language_code,
+        timezone=config.TIMEZONE,
+        reminder_time=reminder_time,
+        next_reminder_at=compute_next_reminder_at(config.TIMEZONE, reminder_time),
     )
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        user = User(
-            telegram_id=telegram_id,
-            username=username,
-            full_name=full_name,
-            language_code=language_code,
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.telegram_id],
+        set_={
+            "username": stmt.excluded.username,
+            "full_name": stmt.excluded.full_name,
+            # Пользователь снова написал боту: возвращаем его в рассылки,
+            # пропущенные за время недоступности напоминания не досылаем
+            "next_reminder_at": case(
+                (User.is_reachable, User.next_reminder_at),
+                else_=next_reminder_expr(),
+            ),
+            "is_reachable": True,
+            "unreachable_reason": None,
+            "unreachable_at": None,
+        },
+    )
+    result = await session.scalars(
+        stmt.returning(User), execution_options={"populate_existing": True}
+    )
+    user = result.one()
+    await session.commit()
     
+    await identity_cache.put(identity_of(user))
     return user
 
 
+def compute_next_reminder_at(tz: str, reminder_time: time, now: Optional[datetime] = None) -> datetime:
+    """Ближайшее время напоминания в часовом поясе пользователя (naive UTC)"""
+    zone = ZoneInfo(tz)
+    local_now = (now or datetime.now(timezone.utc)).astimezone(zone)
+    candidate = datetime.combine(local_now.date(), reminder_time, tzinfo=zone)
+    if candidate <= local_now:
+        candidate = datetime.combine(local_now.date() + timedelta(days=1), reminder_time, tzinfo=zone)
+    return candidate.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def next_reminder_expr():
+    """
+    SQL-версия compute_next_reminder_at для массового сдвига напоминаний
+
+    Считается от now() транзакции, поэтому пользователи, пропустившие
+    несколько дней (например, пока бот не работал), получают ближайшее
+    будущее время, а не вчерашнее.
+    """
+    now_utc = func.timezone("UTC", func.now())
+    local_today = cast(func.timezone(User.timezone, func.now()), Date)
+    today_at = func.timezone("UTC", func.timezone(User.timezone, local_today + User.reminder_time))
+    tomorrow_at = func.timezone("UTC", func.timezone(User.timezone, local_today + 1 + User.reminder_time))
+    return case((today_at > now_utc, today_at), else_=tomorrow_at)
+
+
 async def get_user(session: AsyncSession, telegram_id: int) -> Optional[User]:
     """Получить пользователя по telegram_id"""
     result = await session.execute(
@@ -44,28 +95,135 @@ async def get_user(session: AsyncSession, telegram_id: int) -> Optional[User]:
     return result.scalar_one_or_none()
 
 
-async def add_points(session: AsyncSession, user: User, points: int) -> User:
-    """Добавить очки пользователю"""
-    user.points += points
-    await session.commit()
-    await session.refresh(user)
-    return user
-
+async def update_streak(session: AsyncSession, user_id: int, increment: bool = True) -> Tuple[int, int]:
+    """
+    Обновить серию пользователя (атомарно, одним UPDATE)
 
-async def update_streak(session: AsyncSession, user: User, increment: bool = True) -> User:
-    """Обновить серию пользователя"""
+    Returns:
+        (текущая серия, лучшая серия)
+    """
     if increment:
-        user.current_streak += 1
-        if user.current_streak > user.longest_streak:
-            user.longest_streak = user.current_streak
+        values = {
+            "current_streak": User.current_streak + 1,
+            "longest_streak": func.greatest(User.longest_streak, User.current_streak + 1),
+        }
     else:
-        user.current_streak = 0
+        values = {"current_streak": 0}
     
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(**values)
+        .returning(User.current_streak, User.longest_streak)
+        .execution_options(synchronize_session="fetch")
+    )
+    current_streak, longest_streak = result.one()
+    return current_streak, longest_streak
+
+
+async def set_notifications(session: AsyncSession, user_id: int, enabled: bool) -> User:
+    """
+    Включить или выключить напоминания пользователя
+
+    При включении время следующего напоминания пересчитывается: пока
+    уведомления были выключены, next_reminder_at не сдвигался.
+    """
+    values = {"notifications_enabled": enabled}
+    if enabled:
+        values["next_reminder_at"] = next_reminder_expr()
+    
+    result = await session.scalars(
+        update(User)
+        .where(User.id == user_id)
+        .values(**values)
+        .returning(User),
+        execution_options={"populate_existing": True},
+    )
+    user = result.one()
     await session.commit()
-    await session.refresh(user)
+    
+    await identity_cache.invalidate(user.telegram_id)
     return user
 
 
+async def get_recipient_page(
+    session: AsyncSession,
+    after_id: int,
+    *filters,
+    limit: int,
+) -> List[Row]:
+    """
+    Страница получателей рассылки (keyset-пагинация по users.id)
+
+    Читает только колонки, нужные для отправки и подстановок в шаблон
+    (id, telegram_id, full_name, username, points, current_streak), через
+    серверный курсор, без ORM-объектов User. Недоступные пользователи
+    пропускаются.
+    """
+    result = await session.stream(
+        select(
+            User.id,
+            User.telegram_id,
+            User.full_name,
+            User.username,
+            User.points,
+            User.current_streak,
+        )
+        .where(User.id > after_id, User.is_reachable == True, *filters)
+        .order_by(User.id)
+        .limit(limit)
+        .execution_options(yield_per=limit)
+    )
+    return [row async for row in result]
+
+
+async def iter_recipients(*filters, page_size: Optional[int] = None) -> AsyncIterator[Row]:
+    """
+    Потоковая выборка получателей рассылки
+
+    Каждая страница читается в отдельной короткой сессии, поэтому в памяти
+    одновременно находится не больше page_size строк и соединение
+    не удерживается на время отправки.
+    """
+    page_size = page_size or config.BROADCAST_PAGE_SIZE
+    last_id = 0
+    
+    while True:
+        async with get_session() as session:
+            page = await get_recipient_page(session, last_id, *filters, limit=page_size)
+        
+        for row in page:
+            yield row
+        
+        if len(page) < page_size:
+            return
+        last_id = page[-1].id
+
+
+async def mark_users_unreachable(unreachable: Dict[int, str]):
+    """
+    Исключить пользователей из рассылок
+
+    Args:
+        unreachable: telegram_id -> причина ('blocked', 'deactivated', 'chat_not_found')
+    """
+    if not unreachable:
+        return
+    
+    reason = case(unreachable, value=User.telegram_id)
+    async with get_session() as session:
+        await session.execute(
+            update(User)
+            .where(User.telegram_id.in_(list(unreachable)))
+            .values(
+                is_reachable=False,
+                unreachable_reason=reason,
+                unreachable_at=func.timezone("UTC", func.now()),
+            )
+        )
+    await identity_cache.invalidate(*unreachable)
+
+
 async def is_admin(telegram_id: int) -> bool:
     """Проверить, является ли пользователь администратором"""
     return telegram_id in config.ADMIN_IDS
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Битовая карта дней
+
+Один бит на день начиная с базовой даты (для навыков — start_date):
+день start + i хранится в бите i % 8 байта i // 8, младший бит первым.
+Такой же порядок битов у get_bit/set_bit в PostgreSQL, поэтому карту
+можно менять прямо в UPDATE (sql_set_day), не читая строку, а читать
+уже загруженную карту — функциями ниже.
+"""
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import Date, LargeBinary, case, func, literal
+
+
+def _as_int(bitmap: Optional[bytes]) -> int:
+    return int.from_bytes(bitmap or b"", "little")
+
+
+def has_day(bitmap: Optional[bytes], start: Optional[date], day: date) -> bool:
+    """Отмечен ли день"""
+    if start is None:
+        return False
+    index = (day - start).days
+    return index >= 0 and bool(_as_int(bitmap) >> index & 1)
+
+
+def count_days(bitmap: Optional[bytes]) -> int:
+    """Сколько дней отмечено"""
+    return bin(_as_int(bitmap)).count("1")
+
+
+def current_streak(bitmap: Optional[bytes], start: Optional[date], today: date) -> int:
+    """
+    Дней подряд до сегодняшнего включительно
+
+    Если сегодня еще не отмечено, серия считается до вчерашнего дня:
+    она не прервана, пока день не закончился.
+    """
+    if start is None:
+        return 0
+    index = (today - start).days
+    value = _as_int(bitmap)
+    if index >= 0 and not value >> index & 1:
+        index -= 1
+    if index < 0:
+        return 0
+    gaps = ~value & ((1 << (index + 1)) - 1)
+    # Серия заканчивается на бите index и тянется вниз до старшего нулевого бита
+    return index + 1 - gaps.bit_length()
+
+
+def longest_streak(bitmap: Optional[bytes]) -> int:
+    """Самая длинная серия отмеченных дней подряд"""
+    value = _as_int(bitmap)
+    length = 0
+    while value:
+        value &= value >> 1
+        length += 1
+    return length
+
+
+def heatmap(bitmap: Optional[bytes], start: Optional[date], first: date, last: date) -> List[bool]:
+    """Отметки по дням с first по last включительно (для календаря активности)"""
+    if start is None:
+        return [False] * ((last - first).days + 1)
+    value = _as_int(bitmap)
+    offset = (first - start).days
+    return [
+        index >= 0 and bool(value >> index & 1)
+        for index in range(offset, offset + (last - first).days + 1)
+    ]
+
+
+def sql_set_day(column, start_column, day: date):
+    """
+    SQL-выражение: column с отмеченным днем (для UPDATE без чтения строки)
+
+    Если start_column пуст, день становится началом карты (бит 0); тот же
+    UPDATE должен заполнить start_column через sql_start_date.
+    """
+    index = literal(day, Date) - sql_start_date(start_column, day)
+    grown = case(
+        (func.length(column) * 8 > index, column),
+        else_=column.op("||")(
+            func.decode(func.repeat("00", index // 8 + 1 - func.length(column)), "hex")
+        ),
+    )
+    return func.set_bit(grown, index, 1, type_=LargeBinary)
+
+
+def sql_start_date(start_column, day: date):
+    """SQL-выражение: начало карты, а для строк без него — день day"""
+    return func.coalesce(start_column, literal(day, Date))
@@ -1,8 +1,12 @@
 """Утилиты для работы с БД"""
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.base import async_session_maker
+from src.database.base import async_session_maker, engine
+
+ROUND_TRIPS_KEY = "round_trips"
 
 
 @asynccontextmanager
@@ -14,4 +18,48 @@ async def get_session():
             await session.commit()
         except Exception:
             await session.rollback()
-            raise
\ No newline at end of file
+            raise
+
+
+@dataclass
+class RoundTrips:
+    """Обращения к БД: выполненные запросы и завершения транзакций"""
+    statements: int = 0
+    commits: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.statements + self.commits
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = conn.info.get(ROUND_TRIPS_KEY)
+    if counter is not None:
+        counter.statements += 1
+
+
+@event.listens_for(engine.sync_engine, "commit")
+@event.listens_for(engine.sync_engine, "rollback")
+def _count_commit(conn):
+    counter = conn.info.get(ROUND_TRIPS_KEY)
+    if counter is not None:
+        counter.commits += 1
+
+
+@asynccontextmanager
+async def count_round_trips(session: AsyncSession):
+    """
+    Посчитать обращения к БД внутри блока
+
+    Учитываются запросы и COMMIT/ROLLBACK на соединении, которое сессия
+    использует при входе в блок (его транзакция открывается здесь).
+    """
+    counter = RoundTrips()
+    connection = await session.connection()
+    info = connection.sync_connection.info
+    info[ROUND_TRIPS_KEY] = counter
+    try:
+        yield counter
+    finally:
+        info.pop(ROUND_TRIPS_KEY, None)
@@ -0,0 +1,24 @@
+"""Подключение к Redis"""
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from src.config import config
+
+_redis: Optional[Redis] = None
+
+
+def get_redis() -> Redis:
+    """Общий для процесса клиент Redis (пул соединений создается лениво)"""
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(config.REDIS_URL, decode_responses=True)
+    return _redis
+
+
+async def close_redis():
+    """Закрыть соединения с Redis"""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
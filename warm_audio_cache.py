@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Скрипт для предзагрузки аудио сур в Telegram (заполнение кэша file_id)"""
+import asyncio
+import logging
+
+from src.bot import create_bot
+from src.config import config
+from src.database.base import init_db
+from src.handlers.quran import AUDIO_DIR, SURAS
+from src.services.audio_library import build_audio_manifest, send_sura_audio
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Загрузить в приватный чат все суры, у которых еще нет file_id"""
+    config.validate()
+    if not config.STORAGE_CHAT_ID:
+        raise ValueError("STORAGE_CHAT_ID не установлен в .env файле")
+    
+    await init_db()
+    manifest = await build_audio_manifest(AUDIO_DIR, SURAS)
+    
+    bot = create_bot()
+    uploaded = 0
+    failed = 0
+    try:
+        for sura_num, entry in manifest.items():
+            if entry.file_id:
+                continue
+            
+            sura = SURAS[sura_num]
+            try:
+                await send_sura_audio(
+                    bot,
+                    config.STORAGE_CHAT_ID,
+                    entry,
+                    title=f"Сура {sura_num}. {sura['name_ar']}",
+                    performer="Толкование ас-Саади",
+                    disable_notification=True,
+                )
+                uploaded += 1
+                logger.info(f"Сура {sura_num} загружена ({entry.size / (1024*1024):.1f} MB)")
+            except Exception as e:
+                failed += 1
+                logger.error(f"Ошибка загрузки суры {sura_num}: {e}")
+    finally:
+        await bot.session.close()
+    
+    logger.info(f"Предзагрузка завершена. Загружено: {uploaded}, Ошибок: {failed}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())